@@ -0,0 +1,97 @@
+"""
+Benchmark RegHexIndex against loading reghex.txt into a dict.
+
+Usage: python .internal/bench/bench_reghex.py [entries]  (Linux only, reads /proc)
+
+Generates a synthetic reghex.txt in a temp directory and builds the index
+once, then loads each in a fresh subprocess so max RSS is measured independently.
+"""
+import json
+import os
+import random
+import string
+import subprocess
+import sys
+import tempfile
+import time
+
+HWM = '''
+def hwm():
+    # ru_maxrss survives fork/exec on Linux, VmHWM is reset with the new mm
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1])
+'''
+
+CODE = {
+    'dict': """
+import json, sys, time
+{hwm}
+start = time.perf_counter()
+with open(sys.argv[1]) as f:
+    data = json.loads(f.read())
+load = time.perf_counter() - start
+keys = list(data)[:10000]
+start = time.perf_counter()
+for k in keys:
+    data.get(k)
+lookup = (time.perf_counter() - start) / len(keys)
+print(load, lookup, hwm())
+""",
+    'index': """
+import json, sys, time
+{hwm}
+sys.path.insert(0, sys.argv[3])
+from reghex import RegHexIndex
+start = time.perf_counter()
+index = RegHexIndex(sys.argv[2])
+load = time.perf_counter() - start
+keys = [index._reg_key(i).decode() for i in range(0, len(index), max(len(index) // 10000, 1))]
+start = time.perf_counter()
+for k in keys:
+    index.get_hex(k)
+lookup = (time.perf_counter() - start) / len(keys)
+print(load, lookup, hwm())
+""",
+}
+
+
+def generate(path: str, count: int) -> None:
+    chars = string.ascii_uppercase + string.digits
+    data = {}
+    while len(data) < count:
+        reg = random.choice('NCGDF') + ''.join(random.choices(chars, k=random.randint(3, 6)))
+        data[reg] = f'{random.getrandbits(24):06x}'
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    # import reghex.py directly, the flightaware package needs redbot
+    here = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'flightaware')
+    with tempfile.TemporaryDirectory() as tmp:
+        source, index = os.path.join(tmp, 'reghex.txt'), os.path.join(tmp, 'reghex.idx')
+        generate(source, count)
+        base = subprocess.run([sys.executable, '-c', HWM + 'print(hwm())'],
+                              capture_output=True, text=True, check=True)
+        baseline = int(base.stdout)
+        sys.path.insert(0, here)
+        from reghex import RegHexIndex
+        start = time.perf_counter()
+        RegHexIndex.build(source, index)
+        build = time.perf_counter() - start
+        print(f'{count} entries, index build {build:.2f}s')
+        for name, code in CODE.items():
+            start = time.perf_counter()
+            r = subprocess.run([sys.executable, '-c', code.format(hwm=HWM), source, index, here],
+                               capture_output=True, text=True, check=True)
+            total = time.perf_counter() - start
+            load, lookup, rss = r.stdout.split()
+            print(f'{name:>6}: load {float(load):.4f}s, lookup {float(lookup) * 1e6:.1f}us, '
+                  f'max RSS +{(int(rss) - baseline) / 1024:.0f} MB, total {total:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
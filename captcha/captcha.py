@@ -3,10 +3,10 @@ import discord
 import json
 import logging
 import redis.asyncio as redis
-from typing import Optional
+import time
+from typing import Dict, List, Optional
 
 from redbot.core import commands, Config
-from redbot.core.utils import AsyncIter
 from redbot.core.utils.menus import start_adding_reactions
 from redbot.core.utils.predicates import ReactionPredicate
 
@@ -22,13 +22,27 @@ class Captcha(commands.Cog):
         'enabled': False,
         'verified': 0,
         'bots': True,
+        'bootstrap': {},
+        'bootstrap_pending': [],
     }
 
+    workers_count = 8
+    fetch_interval = 0.25
+    checkpoint_interval = 30
+
     def __init__(self, bot):
         self.bot = bot
         self.config = Config.get_conf(self, 1337, True)
         self.config.register_guild(**self.guild_default)
         self.loop: Optional[asyncio.Task] = None
+        self.workers: List[asyncio.Task] = []
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.fetch_lock = asyncio.Lock()
+        self.fetch_last: float = 0.0
+        self.processed: int = 0
+        self.fetched: int = 0
+        self.jobs: Dict[int, asyncio.Task] = {}
+        self.resume_task: Optional[asyncio.Task] = None
         self.redis: Optional[redis.Redis] = None
         self.pubsub: Optional[redis.client.PubSub] = None
         self.url: Optional[str] = None
@@ -51,12 +65,21 @@ class Captcha(commands.Cog):
         await self.redis.ping()
         self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
         self.loop = asyncio.create_task(self.captcha_loop())
+        for i in range(self.workers_count):
+            self.workers.append(asyncio.create_task(self.captcha_worker(i)))
+        self.resume_task = asyncio.create_task(self.resume_bootstrap())
         log.info('%s: Cog Load Finish', self.__cog_name__)
 
     async def cog_unload(self):
         log.info('%s: Cog Unload', self.__cog_name__)
         if self.loop and not self.loop.cancelled():
             self.loop.cancel()
+        for worker in self.workers:
+            worker.cancel()
+        if self.resume_task:
+            self.resume_task.cancel()
+        for job in self.jobs.values():
+            job.cancel()
         if self.pubsub:
             await self.pubsub.close()
 
@@ -64,12 +87,117 @@ class Captcha(commands.Cog):
         await self.bot.wait_until_ready()
         log.info('%s: Start Main Loop', self.__cog_name__)
         await self.pubsub.subscribe('red.captcha')
-        while self is self.bot.get_cog('Captcha'):
-            log.debug('captcha_loop:while')
-            message = await self.pubsub.get_message(timeout=None)
-            if message:
+        async for message in self.pubsub.listen():
+            log.debug('captcha_loop:message')
+            if message and message['type'] == 'message':
+                self.queue.put_nowait(message)
+                backlog = self.queue.qsize()
+                if backlog > self.workers_count:
+                    log.warning('Verification backlog: %s', backlog)
+
+    async def captcha_worker(self, num: int):
+        log.debug('captcha_worker: %s', num)
+        while True:
+            message = await self.queue.get()
+            try:
                 await self.process_message(message)
-            await asyncio.sleep(0.01)
+            finally:
+                self.processed += 1
+                self.queue.task_done()
+
+    async def resume_bootstrap(self):
+        await self.bot.wait_until_ready()
+        all_guilds: dict = await self.config.all_guilds()
+        for guild_id, data in all_guilds.items():
+            if not data.get('bootstrap'):
+                continue
+            guild: discord.Guild = self.bot.get_guild(int(guild_id))
+            if not guild:
+                continue
+            log.info('Resuming Bootstrap: %s', guild.id)
+            self.start_bootstrap(guild)
+
+    def start_bootstrap(self, guild: discord.Guild):
+        job = self.jobs.get(guild.id)
+        if job and not job.done():
+            return
+        self.jobs[guild.id] = asyncio.create_task(self.run_bootstrap(guild))
+
+    async def run_bootstrap(self, guild: discord.Guild):
+        """Add Verified Role to Members with Persisted Checkpoints."""
+        conf = self.config.guild(guild)
+        job: dict = await conf.bootstrap()
+        verified: discord.Role = guild.get_role(await conf.verified())
+        channel = guild.get_channel(job.get('channel', 0))
+        if not job or not verified:
+            await conf.bootstrap.set({})
+            await conf.bootstrap_pending.set([])
+            return
+        if 'done' not in job:
+            # snapshot member ids so members joining mid-run cannot shift the checkpoint,
+            # written once, only the done index is checkpointed after this
+            pending = [m.id for m in guild.members if verified not in m.roles]
+            await conf.bootstrap_pending.set(pending)
+            job['done'] = 0
+            await conf.bootstrap.set(job)
+        else:
+            pending: List[int] = await conf.bootstrap_pending()
+        total = len(pending)
+        log.info('Bootstrap %s: %s/%s members done', guild.id, job['done'], total)
+        message: Optional[discord.Message] = None
+        try:
+            if channel:
+                message = await channel.send(
+                    f"⌛ Adding `Verified` Role: {job['done']}/{total} Members.")
+            checkpoint = time.monotonic()
+            for i in range(job['done'], total):
+                member: discord.Member = guild.get_member(pending[i])
+                if member and verified not in member.roles:
+                    try:
+                        # discord.py paces these at the route's rate limit
+                        await member.add_roles(verified)
+                    except discord.NotFound:
+                        pass
+                job['done'] = i + 1
+                if time.monotonic() - checkpoint > self.checkpoint_interval:
+                    await conf.bootstrap.set_raw('done', value=job['done'])
+                    checkpoint = time.monotonic()
+                if message and (job['done'] % 250 == 0 or job['done'] == total):
+                    await message.edit(
+                        content=f"⌛ Adding `Verified` Role: {job['done']}/{total} "
+                                f"Members.")
+            await conf.bootstrap.set({})
+            await conf.bootstrap_pending.set([])
+            if message:
+                await message.edit(
+                    content=f'✅ Added `Verified` Role to {total} Members.')
+        except asyncio.CancelledError:
+            await conf.bootstrap.set_raw('done', value=job['done'])
+            raise
+        except Exception as error:
+            log.exception(error)
+            await conf.bootstrap.set_raw('done', value=job['done'])
+            if message:
+                try:
+                    await message.edit(content=f'⛔ Bootstrap Error: {error}')
+                except discord.HTTPException:
+                    pass
+        finally:
+            self.jobs.pop(guild.id, None)
+
+    async def get_member(self, guild: discord.Guild,
+                         user_id: int) -> discord.Member:
+        """Get Member from Cache or Fetch with Rate Limit."""
+        member: Optional[discord.Member] = guild.get_member(user_id)
+        if member:
+            return member
+        async with self.fetch_lock:
+            wait = self.fetch_last + self.fetch_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.fetch_last = time.monotonic()
+        self.fetched += 1
+        return await guild.fetch_member(user_id)
 
     async def process_message(self, message: dict) -> None:
         try:
@@ -85,7 +213,7 @@ class Captcha(commands.Cog):
 
             user_id = data['user']
             log.debug('user_id: %s', user_id)
-            member: discord.Member = await guild.fetch_member(int(user_id))
+            member = await self.get_member(guild, int(user_id))
 
             log.debug('data.requests: %s', data['requests'])
             resp = dict()
@@ -238,7 +366,10 @@ class Captcha(commands.Cog):
         out = f'CAPTCHA Settings:\n' \
               f'Enabled: **{config["enabled"]}**\n' \
               f'Role: {role_name}\n' \
-              f'Bots: {config["bots"]}'
+              f'Bots: {config["bots"]}\n' \
+              f'Backlog: **{self.queue.qsize()}** / ' \
+              f'Processed: {self.processed} / Fetched: {self.fetched}\n' \
+              f'Bootstrap: **{bool(config["bootstrap"])}**'
         await ctx.send(out)
 
     @captcha.command(name='setup', aliases=['auto', 'a'])
@@ -273,8 +404,7 @@ class Captcha(commands.Cog):
             everyone: discord.Role = ctx.guild.get_role(ctx.guild.id)
             log.debug(everyone.permissions)
 
-            if config['verified']:
-                verified = ctx.guild.get_role(config['verified'])
+            verified = ctx.guild.get_role(config['verified'])
             if not verified:
                 await bm.edit(content='⌛ Creating Role `Verified`.')
                 verified: discord.Role = await ctx.guild.create_role(
@@ -283,12 +413,10 @@ class Captcha(commands.Cog):
                 )
                 await self.config.guild(ctx.guild).verified.set(verified.id)
 
-            await bm.edit(content='⌛ Adding `Verified` Role to all Members.')
-            member: discord.Member
-            async for member in AsyncIter(ctx.guild.members):
-                if verified not in member.roles:
-                    log.debug('Adding Role to: %s', member)
-                    await member.add_roles(verified)
+            await bm.edit(content='⌛ Starting `Verified` Role Bootstrap.')
+            bootstrap = {'channel': ctx.channel.id}
+            await self.config.guild(ctx.guild).bootstrap.set(bootstrap)
+            self.start_bootstrap(ctx.guild)
 
             await bm.edit(content='⌛ Creating `verification` Channel/Message.')
             everyone_overs = discord.PermissionOverwrite(
@@ -331,4 +459,5 @@ class Captcha(commands.Cog):
 
             await self.config.guild(ctx.guild).enabled.set(True)
             await bm.delete()
-            await ctx.send(content='✅ All Done!')
+            await ctx.send(content='✅ All Done! Role Bootstrap continues '
+                                   'in the background.')
@@ -1,7 +1,6 @@
-import concurrent.futures
+import asyncio
 import datetime
 import discord
-import docker
 import io
 import json
 import logging
@@ -12,6 +11,10 @@ from zipline import Zipline
 
 from redbot.core import commands, Config
 
+from .dockerd import DockerAPI
+from .index import ContainerIndex
+from .sampler import StatsSampler
+
 log = logging.getLogger('red.docker')
 
 
@@ -30,8 +33,9 @@ class Docker(commands.Cog):
         self.bot = bot
         self.config = Config.get_conf(self, 1337, True)
         self.config.register_global(**self.global_default)
-        self.client: Optional[docker.DockerClient] = None
-        self.client_low: Optional[docker.APIClient] = None
+        self.client: Optional[DockerAPI] = None
+        self.index: Optional[ContainerIndex] = None
+        self.sampler: Optional[StatsSampler] = None
         self.zipline: Optional[Zipline] = None
         self.portainer_url: Optional[str] = None
         self.color = 1294073
@@ -41,8 +45,11 @@ class Docker(commands.Cog):
         data: Dict[str, str] = await self.config.all()
         log.debug('data: %s', data)
         log.info('Docker URL: %s', data['docker_url'])
-        self.client = docker.DockerClient(base_url=data['docker_url'])
-        self.client_low = docker.APIClient(base_url=data['docker_url'])
+        self.client = DockerAPI(data['docker_url'])
+        self.index = ContainerIndex(self.client)
+        self.index.start()
+        self.sampler = StatsSampler(self.client)
+        self.sampler.start()
         self.portainer_url = data.get('portainer_url')
         log.info('Portainer URL: %s', self.portainer_url)
 
@@ -57,6 +64,12 @@ class Docker(commands.Cog):
 
     async def cog_unload(self):
         log.info('%s: Cog Unload', self.__cog_name__)
+        if self.index:
+            self.index.stop()
+        if self.sampler:
+            self.sampler.stop()
+        if self.client:
+            await self.client.close()
 
     @commands.group(name='docker', aliases=['dock', 'dockerd'])
     @commands.guild_only()
@@ -85,7 +98,7 @@ class Docker(commands.Cog):
     async def _docker_info(self, ctx: commands.Context):
         """Docker Info"""
         await ctx.typing()
-        info = self.client.info()
+        info = await self.client.info()
         embed: discord.Embed = self.get_embed(ctx, info)
         embed.set_author(name='docker info')
 
@@ -128,39 +141,46 @@ class Docker(commands.Cog):
     @commands.max_concurrency(1, commands.BucketType.default)
     async def _docker_stats(self, ctx: commands.Context, limit: Optional[int] = 0,
                             sort: Optional[str] = 'mem'):
-        """Docker Stats"""
+        """Docker Stats, sort by: mem, cpu, net, io or name"""
         log.debug('limit: %s', limit)
         log.debug('sort: %s', sort)
-        await ctx.typing()
-        info: Dict = self.client.info()
-        containers: List = self.client.containers.list()
+        info: Dict = await self.client.info()
         embed: discord.Embed = self.get_embed(ctx, info)
         embed.set_author(name='docker stats')
-        stats: List[Dict] = self.process_stats(containers)
+        stats: List[Dict] = self.sampler.latest()
+        if not stats:
+            log.debug('No samples yet, fetching stats')
+            await ctx.typing()
+            containers: List[dict] = await self.client.containers()
+            raw_stats: List[Dict] = await self.process_stats(containers)
+            stats = [{'id': x['id'], 'name': x['name'].lstrip('/'), **StatsSampler.parse_stat(x)}
+                     for x in raw_stats]
         if sort[:3] in ['nam', 'id']:
             stats = sorted(stats, key=lambda x: x['name'])
         elif sort[:3] == 'cpu':
-            stats = sorted(stats, key=lambda x: x['cpu_stats']['cpu_usage']['total_usage'])
-            stats.reverse()
+            stats = sorted(stats, key=lambda x: x['cpu'], reverse=True)
+        elif sort[:3] == 'net':
+            stats = sorted(stats, key=lambda x: x['net_rx'] + x['net_tx'], reverse=True)
+        elif sort[:3] in ['blk', 'io', 'dis']:
+            stats = sorted(stats, key=lambda x: x['blk_read'] + x['blk_write'], reverse=True)
         else:
-            stats = sorted(stats, key=lambda x: x['memory_stats']['usage'])
-            stats.reverse()
+            stats = sorted(stats, key=lambda x: x['mem'], reverse=True)
         overflow = '\n_{} Containers Not Shown..._'
         lines = []
-        async with ctx.typing():
-            for i, stat in enumerate(stats, 1):
-                name = stat['name'].lstrip('/').split('.')[0][:42]
-                mem = self.convert_bytes(stat['memory_stats']['usage'])
-                mem_max = self.convert_bytes(stat['memory_stats']['limit'])
-                cpu = self.calculate_cpu_percent(stat)
-                line = f"{mem}/_{mem_max}_ `{cpu}%` **{name}**"
-                if len('\n'.join(lines + [line])) > (4000 - len(overflow)):
-                    hidden = len(containers) - len(lines)
-                    lines.append(overflow.format(hidden))
-                    break
-                lines.append(line)
-                if limit > 0 and limit == i:
-                    break
+        for i, stat in enumerate(stats, 1):
+            name = stat['name'].split('.')[0][:42]
+            mem = self.convert_bytes(stat['mem'])
+            mem_max = self.convert_bytes(stat['mem_limit'])
+            spark = StatsSampler.sparkline(self.sampler.series(stat['id'], 'cpu'))
+            spark = f' `{spark}`' if spark else ''
+            line = f"{mem}/_{mem_max}_ `{stat['cpu']}%`{spark} **{name}**"
+            if len('\n'.join(lines + [line])) > (4000 - len(overflow)):
+                hidden = len(stats) - len(lines)
+                lines.append(overflow.format(hidden))
+                break
+            lines.append(line)
+            if limit > 0 and limit == i:
+                break
 
         embed.description = '\n'.join(lines)
         log.debug('embed.description: %s', embed.description)
@@ -173,11 +193,11 @@ class Docker(commands.Cog):
     async def _docker_top(self, ctx: commands.Context):
         """Docker Top"""
         await ctx.typing()
-        info = self.client.info()
+        info = await self.client.info()
         embed: discord.Embed = self.get_embed(ctx, info)
         embed.set_author(name='docker top')
-        containers = self.client.containers.list()
-        top = self.process_top(containers)
+        containers = await self.client.containers()
+        top = await self.process_top(containers)
         top = re.sub(r'[a-zA-Z0-9]{28,}', 'xxxxxx', top)
         bytes_io = io.BytesIO(bytes(top, 'utf-8'))
         stamp = datetime.datetime.now().strftime('%y%m%d%H%M%S')
@@ -189,14 +209,13 @@ class Docker(commands.Cog):
             file = discord.File(bytes_io, name)
             await ctx.send('Top:', file=file)
 
-    @staticmethod
-    def process_top(containers: List) -> str:
+    async def process_top(self, containers: List[dict]) -> str:
         # Format Headers
         titles = ['PID', 'CMD']
         rows = ["{:<8s} | {:s}".format(*titles)]
-        for container in containers:
-            rows.append(f'---> {container.name} <---')
-            data = container.top()
+        tops = await asyncio.gather(*[self.client.top(x['Id']) for x in containers])
+        for container, data in zip(containers, tops):
+            rows.append(f"---> {self.get_name(container)} <---")
             pid = data['Titles'].index('PID')
             cmd = data['Titles'].index('CMD')
             for proc in data['Processes']:
@@ -220,16 +239,16 @@ class Docker(commands.Cog):
     async def _d_container_list(self, ctx: commands.Context, limit: Optional[int]):
         """Docker Container List"""
         await ctx.typing()
-        info = self.client.info()
-        containers = self.client.containers.list()
+        info = await self.client.info()
+        containers = await self.client.containers()
         embed: discord.Embed = self.get_embed(ctx, info)
         embed.set_author(name='docker container list')
 
         overflow = '\n_{} Containers Not Shown..._'
         lines = ['```diff']
         for cont in containers:
-            name = cont.name.split('.')[0]
-            if cont.status == 'running':
+            name = self.get_name(cont).split('.')[0]
+            if cont['State'] == 'running':
                 line = f'+ {name}'
             else:
                 line = f'- {name}'
@@ -247,6 +266,25 @@ class Docker(commands.Cog):
             embed.url = self.portainer_url + '/docker/containers'
         await ctx.send(embed=embed)
 
+    @_d_container.command(name='find', aliases=['f', 'search'])
+    @commands.guild_only()
+    @commands.is_owner()
+    @commands.max_concurrency(1, commands.BucketType.default)
+    async def _d_container_find(self, ctx: commands.Context, query: str):
+        """Docker Container Find by ID, name, image, label or project"""
+        if not len(self.index):
+            await self.index.refresh()
+        results = self.index.search(query)
+        if not results:
+            return await ctx.send(f'⛔ No Containers Found: `{query}`')
+        lines = []
+        for container in results:
+            _, icon = self.get_color_icon(container['state'])
+            project = f" _{container['project']}_" if container['project'] else ''
+            lines.append(f"{icon} `{container['id'][:12]}` **{container['short']}**{project} "
+                         f"`{container['image']}`")
+        await ctx.send('\n'.join(lines))
+
     @_d_container.command(name='info', aliases=['i', 'inspect'])
     @commands.guild_only()
     @commands.is_owner()
@@ -255,97 +293,104 @@ class Docker(commands.Cog):
         """Docker Container Info"""
         await ctx.typing()
         log.debug('name_or_id: %s', name_or_id)
-        info = self.client.info()
-        short_id = self.get_id(name_or_id)
+        info = await self.client.info()
+        short_id = await self.get_id(name_or_id)
         if not short_id:
             return await ctx.send(f'⛔ Container Name/ID Not Found: `{name_or_id}`')
-        container = self.client.containers.get(short_id)
+        attrs = await self.client.inspect(short_id)
+        running = attrs['State']['Running']
+        stats = await self.client.stats(short_id) if running else None
+        name, status = attrs['Name'].lstrip('/'), attrs['State']['Status']
 
         embed: discord.Embed = self.get_embed(ctx, info)
         embed.set_author(name='docker container info')
-        stats = container.stats(stream=False)
-        embed.colour, icon = self.get_color_icon(container)
+        embed.colour, icon = self.get_color_icon(status)
 
-        created = datetime.datetime.strptime(container.attrs['Created'][:26], '%Y-%m-%dT%H:%M:%S.%f')
+        created = datetime.datetime.strptime(attrs['Created'][:26], '%Y-%m-%dT%H:%M:%S.%f')
         created_at = int(created.timestamp())
-        started = datetime.datetime.strptime(container.attrs['State']['StartedAt'][:26], '%Y-%m-%dT%H:%M:%S.%f')
-        started_at = int(started.timestamp())
         embed.description = (
-            f"{icon} **{container.name.split('.', 1)[0]}** `{container.short_id}`\n\n"
-            f"{container.name}\n"
-            f"`{container.id}`\n\n"
+            f"{icon} **{name.split('.', 1)[0]}** `{short_id}`\n\n"
+            f"{name}\n"
+            f"`{attrs['Id']}`\n\n"
             f"**Created:** <t:{created_at}:R> on <t:{created_at}:D>\n"
-            f"**Started:** <t:{started_at}:R> on <t:{started_at}:D>\n"
         )
+        if running:
+            started = datetime.datetime.strptime(attrs['State']['StartedAt'][:26], '%Y-%m-%dT%H:%M:%S.%f')
+            started_at = int(started.timestamp())
+            embed.description += f"**Started:** <t:{started_at}:R> on <t:{started_at}:D>\n"
 
         ini = CodeINI()
-        ini.add('Platform', container.attrs['Platform'])
-        ini.add('Image', container.attrs['Config']['Image'].split('@', 1)[0])
-        ini.add('Path', container.attrs['Path'])
-        ini.add('Args', ' '.join(container.attrs['Args']))
-        # ini.add('ExposedPorts', container.attrs['Config']['ExposedPorts'])
+        ini.add('Platform', attrs['Platform'])
+        ini.add('Image', attrs['Config']['Image'].split('@', 1)[0])
+        ini.add('Path', attrs['Path'])
+        ini.add('Args', ' '.join(attrs['Args']))
+        # ini.add('ExposedPorts', attrs['Config']['ExposedPorts'])
 
         embed.description += ini.out()
 
-        if container.attrs['State']['Error']:
+        if attrs['State']['Error']:
             embed._colour = discord.Colour.red()
-            embed.description += f"\n🔴 **Error**\n{container.attrs['State']['Error']}"
-
-        mem = self.convert_bytes(stats['memory_stats']['usage'])
-        mem_max = self.convert_bytes(stats['memory_stats']['limit'])
-        embed.add_field(name='Status', value=container.status)
-        embed.add_field(name='Memory', value=f'{mem} / {mem_max}')
-        embed.add_field(name='CPU', value=f'{self.calculate_cpu_percent(stats)}%')
+            embed.description += f"\n🔴 **Error**\n{attrs['State']['Error']}"
+
+        embed.add_field(name='Status', value=status)
+        if stats:
+            mem = self.convert_bytes(stats['memory_stats']['usage'])
+            mem_max = self.convert_bytes(stats['memory_stats']['limit'])
+            embed.add_field(name='Memory', value=f'{mem} / {mem_max}')
+            embed.add_field(name='CPU', value=f'{self.calculate_cpu_percent(stats)}%')
+        else:
+            embed.add_field(name='Memory', value='not running')
+            embed.add_field(name='CPU', value='not running')
 
-        if 'Health' in container.attrs['State']:
-            embed.add_field(name='Health', value=container.attrs['State']['Health']['Status'])
-            embed.add_field(name='FailStreak', value=container.attrs['State']['Health']['FailingStreak'])
-            embed.add_field(name='RestartCount', value=container.attrs['RestartCount'])
+        if 'Health' in attrs['State']:
+            embed.add_field(name='Health', value=attrs['State']['Health']['Status'])
+            embed.add_field(name='FailStreak', value=attrs['State']['Health']['FailingStreak'])
+            embed.add_field(name='RestartCount', value=attrs['RestartCount'])
 
-        if 'Env' in container.attrs['Config'] and 'TRAEFIK_HOST' in container.attrs['Config']['Env']:
-            embed.add_field(name='Traefik Host', value=container.attrs['Config']['Env']['TRAEFIK_HOST'], inline=False)
+        if 'Env' in attrs['Config'] and 'TRAEFIK_HOST' in attrs['Config']['Env']:
+            embed.add_field(name='Traefik Host', value=attrs['Config']['Env']['TRAEFIK_HOST'], inline=False)
 
-        if container.attrs['NetworkSettings']['Networks']:
+        if attrs['NetworkSettings']['Networks']:
             networks = []
-            for network, data in container.attrs['NetworkSettings']['Networks'].items():
+            for network, data in attrs['NetworkSettings']['Networks'].items():
                 networks.append(f"`{network}`")
             embed.add_field(name='Networks', value=', '.join(networks), inline=False)
 
-        if container.attrs['NetworkSettings']['Ports']:
+        if attrs['NetworkSettings']['Ports']:
             ports = []
-            for port, data in container.attrs['NetworkSettings']['Ports'].items():
+            for port, data in attrs['NetworkSettings']['Ports'].items():
                 ports.append(f"`{port}`")
             embed.add_field(name='Ports', value=', '.join(ports), inline=False)
 
-        if container.attrs['HostConfig']['Binds']:
+        if attrs['HostConfig']['Binds']:
             binds = []
-            for bind in container.attrs['HostConfig']['Binds']:
+            for bind in attrs['HostConfig']['Binds']:
                 s = bind.split(':')
                 binds.append(f"`{s[0]}` -> `{s[1]}`")
             embed.add_field(name='Bind Mounts', value='\n'.join(binds), inline=False)
 
-        # if container.attrs['Mounts']:
+        # if attrs['Mounts']:
         #     mounts = []
-        #     for mount in container.attrs['Mounts']:
+        #     for mount in attrs['Mounts']:
         #         rw = 'RW' if mount['RW'] else 'RO'
         #         mounts.append(f"{rw} ({mount['Mode']}) - {mount['Type']} {mount.get('Name', '')}\n"
         #                       f"`{mount['Source']}` -> `{mount['Destination']}`")
         #     embed.add_field(name='Mounts', value='\n'.join(mounts), inline=False)
 
-        if 'Env' in container.attrs['Config']:
-            del container.attrs['Config']['Env']
-        data = json.dumps(container.attrs, indent=4)
+        if 'Env' in attrs['Config']:
+            del attrs['Config']['Env']
+        data = json.dumps(attrs, indent=4)
         bytes_io = io.BytesIO(bytes(data, 'utf-8'))
 
         content, file = None, None
         if self.zipline:
-            url = self.zipline.send_file(f'{container.short_id}.json', bytes_io)
+            url = self.zipline.send_file(f'{short_id}.json', bytes_io)
             content = url.url
         else:
-            file = discord.File(bytes_io, f'{container.short_id}.json')
+            file = discord.File(bytes_io, f'{short_id}.json')
 
         if self.portainer_url:
-            embed.url = self.portainer_url + f'/docker/containers/{container.id}'
+            embed.url = self.portainer_url + f"/docker/containers/{attrs['Id']}"
         embed.timestamp = datetime.datetime.strptime(info['SystemTime'][:26], '%Y-%m-%dT%H:%M:%S.%f')
         await ctx.send(content, embed=embed, file=file)
 
@@ -397,16 +442,17 @@ class Docker(commands.Cog):
             embed.url = self.portainer_url + '/docker/dashboard'
         return embed
 
-    def get_id(self, name, short=True) -> Optional[str]:
-        containers = self.client.containers.list()
-        for container in containers:
-            # TODO: Improve This and Add Search
-            if name in container.name + container.id:
-                if short:
-                    return container.short_id
-                else:
-                    return container.id
-        return None
+    async def get_id(self, name, short=True) -> Optional[str]:
+        if not len(self.index):
+            await self.index.refresh()
+        container = self.index.resolve(name)
+        if not container:
+            return None
+        return container['id'][:12] if short else container['id']
+
+    @staticmethod
+    def get_name(container: dict) -> str:
+        return container['Names'][0].lstrip('/') if container['Names'] else container['Id'][:12]
 
     @staticmethod
     def calculate_cpu_percent(d, round_to=2):
@@ -418,23 +464,14 @@ class Docker(commands.Cog):
             cpu_percent = cpu_delta / system_delta * 100.0 * cpu_count
         return round(cpu_percent, round_to)
 
-    @staticmethod
-    def process_stats(containers, workers: Optional[int] = 60):
-        def get_stats(container):
-            return container.stats(stream=False)
-        stats = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-            futures = [executor.submit(get_stats, container) for container in containers]
-            for future in concurrent.futures.as_completed(futures):
-                data = future.result()
-                stats.append(data)
-        return stats
+    async def process_stats(self, containers: List[dict]) -> List[dict]:
+        return await asyncio.gather(*[self.client.stats(x['Id']) for x in containers])
 
     @staticmethod
-    def get_color_icon(container) -> Tuple[discord.Color, str]:
-        if container.status == 'running':
+    def get_color_icon(status: str) -> Tuple[discord.Color, str]:
+        if status == 'running':
             return discord.Colour.green(), '🟢'
-        elif container.status == 'paused':
+        elif status == 'paused':
             return discord.Colour.yellow(), '🟡'
         else:
             return discord.Colour.red(), '🔴'
@@ -0,0 +1,112 @@
+import httpx
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+
+class DockerAPI(object):
+    """
+    :param base_url: Docker URL, unix:///var/run/docker.sock or tcp://host:2375
+    """
+    api_version = 'v1.41'
+    http_options = {
+        'timeout': 30,
+    }
+
+    def __init__(self, base_url: str = 'unix://var/run/docker.sock'):
+        self.base_url = base_url
+        if base_url.startswith('unix:'):
+            uds = '/' + base_url.split(':', 1)[1].lstrip('/')
+            transport = httpx.AsyncHTTPTransport(uds=uds)
+            url = 'http://docker'
+        else:
+            transport = httpx.AsyncHTTPTransport()
+            url = base_url.replace('tcp://', 'http://', 1)
+        # streaming stats and events each hold a connection open
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=20)
+        self.client = httpx.AsyncClient(
+            base_url=f'{url.rstrip("/")}/{self.api_version}',
+            transport=transport,
+            limits=limits,
+            **self.http_options,
+        )
+
+    def __repr__(self):
+        return f'DockerAPI(base_url={self.base_url!r})'
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    async def _get_json(self, path: str, params: Optional[dict] = None) -> Any:
+        r = await self.client.get(path, params=params)
+        r.raise_for_status()
+        return r.json()
+
+    async def _stream_json(self, path: str, params: Optional[dict] = None
+                           ) -> AsyncIterator[Dict[str, Any]]:
+        async with self.client.stream('GET', path, params=params,
+                                      timeout=None) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if line.strip():
+                    yield json.loads(line)
+
+    async def info(self) -> Dict[str, Any]:
+        """
+        :return: Dictionary from JSON response
+        https://docs.docker.com/engine/api/v1.41/#tag/System/operation/SystemInfo
+        """
+        return await self._get_json('/info')
+
+    async def containers(self, all_containers: bool = False,
+                         filters: Optional[dict] = None) -> List[dict]:
+        """
+        :param all_containers: Optional: Include stopped containers
+        :param filters: Optional: Filters dictionary
+        :return: List of container summary dictionaries
+        https://docs.docker.com/engine/api/v1.41/#tag/Container/operation/ContainerList
+        """
+        params = {'all': str(all_containers).lower()}
+        if filters:
+            params['filters'] = json.dumps(filters)
+        return await self._get_json('/containers/json', params=params)
+
+    async def inspect(self, container_id: str) -> Dict[str, Any]:
+        """
+        :param container_id: Container ID or Name
+        :return: Dictionary from JSON response
+        """
+        return await self._get_json(f'/containers/{container_id}/json')
+
+    async def top(self, container_id: str) -> Dict[str, Any]:
+        """
+        :param container_id: Container ID or Name
+        :return: Dictionary with Titles and Processes
+        """
+        return await self._get_json(f'/containers/{container_id}/top')
+
+    async def stats(self, container_id: str) -> Dict[str, Any]:
+        """
+        :param container_id: Container ID or Name
+        :return: Single stats sample dictionary
+        """
+        params = {'stream': 'false'}
+        return await self._get_json(f'/containers/{container_id}/stats',
+                                    params=params)
+
+    def stats_stream(self, container_id: str
+                     ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        :param container_id: Container ID or Name
+        :return: Async iterator of stats sample dictionaries
+        """
+        return self._stream_json(f'/containers/{container_id}/stats',
+                                 params={'stream': 'true'})
+
+    def events(self, filters: Optional[dict] = None
+               ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        :param filters: Optional: Filters dictionary
+        :return: Async iterator of event dictionaries
+        """
+        params = {'filters': json.dumps(filters)} if filters else None
+        return self._stream_json('/events', params=params)
@@ -0,0 +1,143 @@
+import asyncio
+import difflib
+import logging
+from typing import Any, Dict, List, Optional
+
+from .dockerd import DockerAPI
+
+log = logging.getLogger('red.docker')
+
+
+class ContainerIndex(object):
+    """
+    Container index kept current from the Docker events stream
+
+    :param client: DockerAPI client
+    :param max_delay: Maximum seconds between event stream reconnects
+    """
+    actions = {'create', 'start', 'restart', 'stop', 'die', 'kill', 'pause',
+               'unpause', 'rename', 'update', 'destroy'}
+    project_label = 'com.docker.compose.project'
+    stack_label = 'com.docker.stack.namespace'
+
+    def __init__(self, client: DockerAPI, max_delay: int = 300):
+        self.client = client
+        self.max_delay = max_delay
+        self.containers: Dict[str, Dict[str, Any]] = {}
+        self.task: Optional[asyncio.Task] = None
+
+    def __repr__(self):
+        return f'ContainerIndex(containers={len(self.containers)})'
+
+    def __len__(self):
+        return len(self.containers)
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self.run())
+
+    def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+
+    async def run(self) -> None:
+        delay = 1
+        while True:
+            try:
+                await self.refresh()
+                delay = 1
+                events = self.client.events({'type': ['container']})
+                async for event in events:
+                    await self.process_event(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                log.warning('ContainerIndex: Event stream error: %s', error)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_delay)
+
+    async def refresh(self) -> None:
+        """Rebuild the whole index from the container list."""
+        containers = await self.client.containers(all_containers=True)
+        self.containers = {x['Id']: self.parse_summary(x) for x in containers}
+        log.debug('ContainerIndex: Indexed %s containers', len(self.containers))
+
+    async def process_event(self, event: Dict[str, Any]) -> None:
+        action = event.get('Action', '')
+        container_id = event.get('Actor', {}).get('ID') or event.get('id')
+        if action not in self.actions or not container_id:
+            return
+        log.debug('ContainerIndex: %s %s', action, container_id[:12])
+        if action == 'destroy':
+            self.containers.pop(container_id, None)
+            return
+        containers = await self.client.containers(
+            all_containers=True, filters={'id': [container_id]})
+        if containers:
+            self.containers[container_id] = self.parse_summary(containers[0])
+        else:
+            self.containers.pop(container_id, None)
+
+    @classmethod
+    def parse_summary(cls, container: Dict[str, Any]) -> Dict[str, Any]:
+        labels = container.get('Labels') or {}
+        names = container.get('Names') or []
+        name = names[0].lstrip('/') if names else container['Id'][:12]
+        return {
+            'id': container['Id'],
+            'name': name,
+            'short': name.split('.', 1)[0],
+            'image': container.get('Image', '').split('@', 1)[0],
+            'state': container.get('State', ''),
+            'labels': labels,
+            'project': labels.get(cls.project_label) or labels.get(cls.stack_label),
+        }
+
+    def get(self, container_id: str) -> Optional[Dict[str, Any]]:
+        return self.containers.get(container_id)
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        :param query: Container ID, name, image, label value or project
+        :param limit: Maximum number of results
+        :return: List of matching containers, best match first
+        """
+        query = query.lower().lstrip('/')
+        if not query:
+            return []
+        exact, prefix, partial = [], [], []
+        for container in self.containers.values():
+            name = container['name'].lower()
+            if query in (container['id'], name, container['short'].lower()):
+                exact.append(container)
+            elif container['id'].startswith(query) or name.startswith(query):
+                prefix.append(container)
+            elif query in name or query in container['image'].lower() or \
+                    query == (container['project'] or '').lower() or \
+                    any(query == str(v).lower() for v in container['labels'].values()):
+                partial.append(container)
+        fuzzy = []
+        if not (exact or prefix or partial):
+            by_short = {}
+            for container in self.containers.values():
+                by_short.setdefault(container['short'].lower(), []).append(container)
+            for match in difflib.get_close_matches(query, by_short, n=limit, cutoff=0.6):
+                fuzzy.extend(by_short[match])
+        results = []
+        for group in (exact, prefix, partial, fuzzy):
+            results.extend(sorted(group, key=lambda x: x['state'] != 'running'))
+        return results[:limit]
+
+    def resolve(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        :param query: Container ID, name or partial/misspelled name
+        :return: Best matching container, preferring running ones, or None
+        """
+        results = self.search(query)
+        if not results:
+            return None
+        best = results[0]
+        query = query.lower().lstrip('/')
+        if query in (best['id'], best['name'].lower()) or best['state'] == 'running':
+            return best
+        # a stopped container only wins on an exact ID or name match
+        return next((x for x in results if x['state'] == 'running'), best)
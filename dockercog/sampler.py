@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from .dockerd import DockerAPI
+
+log = logging.getLogger('red.docker')
+
+
+class StatsSampler(object):
+    """
+    Background Docker stats sampler with a ring buffer per container
+
+    :param client: DockerAPI client
+    :param interval: Seconds between stored samples
+    :param history: Number of samples kept per container
+    :param reconcile: Seconds between container list refreshes
+    """
+    sparks = '▁▂▃▄▅▆▇█'
+
+    def __init__(self, client: DockerAPI, interval: int = 5,
+                 history: int = 120, reconcile: int = 30):
+        self.client = client
+        self.interval = interval
+        self.history = history
+        self.reconcile = reconcile
+        self.samples: Dict[str, Deque[Dict[str, Any]]] = {}
+        self.names: Dict[str, str] = {}
+        self.streams: Dict[str, asyncio.Task] = {}
+        self.task: Optional[asyncio.Task] = None
+
+    def __repr__(self):
+        return f'StatsSampler(containers={len(self.streams)})'
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self.run())
+
+    def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+        for task in self.streams.values():
+            task.cancel()
+        self.streams.clear()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                containers = await self.client.containers()
+                self.sync([x['Id'] for x in containers])
+            except Exception as error:
+                log.warning('StatsSampler: Error listing containers: %s', error)
+            await asyncio.sleep(self.reconcile)
+
+    def sync(self, container_ids: List[str]) -> None:
+        """Start streams for new containers and stop removed ones."""
+        for container_id in container_ids:
+            task = self.streams.get(container_id)
+            if not task or task.done():
+                self.streams[container_id] = asyncio.create_task(
+                    self.stream(container_id))
+        for container_id in set(self.streams) - set(container_ids):
+            self.streams.pop(container_id).cancel()
+            self.samples.pop(container_id, None)
+            self.names.pop(container_id, None)
+
+    async def stream(self, container_id: str) -> None:
+        buffer = self.samples.setdefault(
+            container_id, deque(maxlen=self.history))
+        last = 0.0
+        try:
+            async for stat in self.client.stats_stream(container_id):
+                now = time.monotonic()
+                if now - last < self.interval:
+                    continue
+                last = now
+                self.names[container_id] = stat.get('name', '').lstrip('/')
+                buffer.append(self.parse_stat(stat))
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            log.debug('StatsSampler: Stream ended %s: %s', container_id, error)
+
+    def latest(self) -> List[Dict[str, Any]]:
+        """
+        :return: List of the latest sample for each container
+        """
+        results = []
+        for container_id, buffer in self.samples.items():
+            if buffer:
+                results.append({'id': container_id,
+                                'name': self.names.get(container_id, ''),
+                                **buffer[-1]})
+        return results
+
+    def series(self, container_id: str, key: str) -> List[float]:
+        return [x[key] for x in self.samples.get(container_id, [])]
+
+    @classmethod
+    def sparkline(cls, values: List[float], width: int = 12) -> str:
+        values = values[-width:]
+        if not values:
+            return ''
+        low, high = min(values), max(values)
+        spread = (high - low) or 1
+        last = len(cls.sparks) - 1
+        return ''.join(cls.sparks[int((x - low) / spread * last)]
+                       for x in values)
+
+    @staticmethod
+    def parse_stat(d: Dict[str, Any]) -> Dict[str, Any]:
+        cpu_stats, precpu = d.get('cpu_stats', {}), d.get('precpu_stats', {})
+        cpu_delta = (cpu_stats.get('cpu_usage', {}).get('total_usage', 0)
+                     - precpu.get('cpu_usage', {}).get('total_usage', 0))
+        system_delta = (cpu_stats.get('system_cpu_usage', 0)
+                        - precpu.get('system_cpu_usage', 0))
+        cpu = 0.0
+        if system_delta > 0:
+            cpus = cpu_stats.get('online_cpus', 1)
+            cpu = cpu_delta / system_delta * 100.0 * cpus
+        networks = (d.get('networks') or {}).values()
+        blkio = d.get('blkio_stats', {}).get('io_service_bytes_recursive') or []
+        return {
+            'time': time.time(),
+            'cpu': round(cpu, 2),
+            'mem': d.get('memory_stats', {}).get('usage', 0),
+            'mem_limit': d.get('memory_stats', {}).get('limit', 0),
+            'net_rx': sum(x.get('rx_bytes', 0) for x in networks),
+            'net_tx': sum(x.get('tx_bytes', 0) for x in networks),
+            'blk_read': sum(x.get('value', 0) for x in blkio
+                            if x.get('op', '').lower() == 'read'),
+            'blk_write': sum(x.get('value', 0) for x in blkio
+                             if x.get('op', '').lower() == 'write'),
+        }
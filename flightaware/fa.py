@@ -1,12 +1,19 @@
+import asyncio
 import os
 import httpx
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+import json
+import logging
+import redis.asyncio as redis
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, Awaitable, Callable, Tuple
+
+log = logging.getLogger('red.flightaware')
 
 
 class FlightAware(object):
     """
     :param api_key: FlightAware API Key or AEROAPI_KEY environment variable
+    :param redis_client: Optional: Redis client used to cache responses
     """
     fa_id_url = 'https://flightaware.com/live/flight/id/'
     fa_flight_url = 'https://flightaware.com/live/flight/'
@@ -28,8 +35,34 @@ class FlightAware(object):
         'timeout': 10,
     }
 
-    def __init__(self, api_key: Optional[str] = None):
+    cache_prefix = 'fa:cache'
+    cache_stats = 'fa:cache:stats'
+    # Seconds: (found, not found)
+    cache_ttl = {
+        'flights_ident': (60*5, 60*5),
+        'flights_search': (60, 60),
+        'flights_map': (60, 60),
+        'operators_id': (60*60*24*30, 60*60*24),
+        'owner_ident': (60*60*24*30, 60*60*24),
+    }
+    not_found = {'_not_found': True}
+    max_concurrent = 4
+    usage_prefix = 'fa:usage'
+    # Estimated USD per call, adjust for your AeroAPI tier
+    call_cost = {
+        'flights_ident': 0.005,
+        'flights_search': 0.005,
+        'flights_map': 0.03,
+        'operators_id': 0.0025,
+        'owner_ident': 0.005,
+    }
+
+    def __init__(self, api_key: Optional[str] = None,
+                 redis_client: Optional[redis.Redis] = None):
         self.api_key = api_key or os.environ['AEROAPI_KEY']
+        self.redis = redis_client
+        self.inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.semaphore = asyncio.Semaphore(self.max_concurrent)
         self.headers = {
             'Accept': 'application/json; charset=UTF-8',
             'x-apikey': self.api_key,
@@ -44,19 +77,148 @@ class FlightAware(object):
             r.raise_for_status()
             return r.json()
 
+    async def _cached(self, namespace: str, ident: str,
+                      func: Callable[[], Awaitable[Dict[str, Any]]],
+                      cache_only: bool = False) -> Dict[str, Any]:
+        """
+        :param namespace: Endpoint namespace, a key of cache_ttl
+        :param ident: Identifier unique within the namespace
+        :param func: Coroutine function making the API request on a miss
+        :param cache_only: Optional: Return empty on a miss without a request
+        :return: Dictionary from JSON response or cache, empty if not found
+
+        Concurrent calls for the same namespace and ident share one request.
+        """
+        key = (namespace, ident)
+        task = self.inflight.get(key)
+        if task:
+            log.debug('Coalesced request: %s: %s', namespace, ident)
+        elif cache_only:
+            return await self._cached_request(namespace, ident, func, True)
+        else:
+            task = asyncio.create_task(
+                self._cached_request(namespace, ident, func))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _cached_request(self, namespace: str, ident: str,
+                              func: Callable[[], Awaitable[Dict[str, Any]]],
+                              cache_only: bool = False) -> Dict[str, Any]:
+        if not self.redis:
+            if cache_only:
+                return {}
+            async with self.semaphore:
+                return await func()
+        key = f'{self.cache_prefix}:{namespace}:{ident}'
+        cached: Optional[str] = await self.redis.get(key)
+        if cached is not None:
+            await self.redis.hincrby(self.cache_stats, f'{namespace}:hits', 1)
+            data = json.loads(cached)
+            return {} if data == self.not_found else data
+        if cache_only:
+            await self.redis.hincrby(self.cache_stats, f'{namespace}:skipped', 1)
+            return {}
+        await self.redis.hincrby(self.cache_stats, f'{namespace}:misses', 1)
+        ttl, ttl_not_found = self.cache_ttl[namespace]
+        try:
+            async with self.semaphore:
+                log.info('--- API CALL: %s: %s', namespace, ident)
+                await self.record_call(namespace)
+                data = await func()
+        except httpx.HTTPStatusError as error:
+            if error.response.status_code != 404:
+                raise
+            await self.redis.set(key, json.dumps(self.not_found),
+                                 ex=ttl_not_found)
+            return {}
+        await self.redis.set(key, json.dumps(data or self.not_found),
+                             ex=ttl if data else ttl_not_found)
+        return data or {}
+
+    async def is_cached(self, namespace: str, ident: str) -> bool:
+        """
+        :param namespace: Endpoint namespace, a key of cache_ttl
+        :param ident: Identifier unique within the namespace
+        :return: True if a cached response exists
+        """
+        if not self.redis:
+            return False
+        key = f'{self.cache_prefix}:{namespace}:{ident}'
+        return bool(await self.redis.exists(key))
+
+    async def record_call(self, namespace: str) -> None:
+        """
+        :param namespace: Endpoint namespace, a key of call_cost
+        """
+        now = datetime.now(timezone.utc)
+        cost = self.call_cost.get(namespace, 0)
+        periods = [(now.strftime('%Y-%m-%d'), 60*60*24*40),
+                   (now.strftime('%Y-%m'), 60*60*24*400)]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for period, ttl in periods:
+                key = f'{self.usage_prefix}:{period}'
+                pipe.hincrby(key, f'{namespace}:calls', 1)
+                pipe.hincrbyfloat(key, 'cost', cost)
+                pipe.expire(key, ttl)
+            await pipe.execute()
+
+    async def usage(self, period: str) -> Dict[str, Any]:
+        """
+        :param period: Day as YYYY-MM-DD or Month as YYYY-MM in UTC
+        :return: Dictionary of calls per namespace and total cost
+        """
+        data = {'calls': {x: 0 for x in self.call_cost}, 'cost': 0.0}
+        if not self.redis:
+            return data
+        raw: Dict[str, str] = await self.redis.hgetall(
+            f'{self.usage_prefix}:{period}')
+        for field, value in raw.items():
+            if field == 'cost':
+                data['cost'] = float(value)
+            elif field.endswith(':calls'):
+                data['calls'][field.rpartition(':')[0]] = int(value)
+        return data
+
+    async def cache_stats_all(self) -> Dict[str, Dict[str, int]]:
+        """
+        :return: Dictionary of namespace: {hits, misses, skipped}
+        """
+        stats = {x: {'hits': 0, 'misses': 0, 'skipped': 0}
+                 for x in self.cache_ttl}
+        if not self.redis:
+            return stats
+        raw: Dict[str, str] = await self.redis.hgetall(self.cache_stats)
+        for field, value in raw.items():
+            namespace, _, kind = field.rpartition(':')
+            if namespace in stats:
+                stats[namespace][kind] = int(value)
+        return stats
+
     async def flights_ident(self, ident: str,
-                            params: Optional[Dict[str, Any]] = None
-                            ) -> Dict[str, Any]:
+                            params: Optional[Dict[str, Any]] = None,
+                            cache_only: bool = False) -> Dict[str, Any]:
         """
         :param ident: Registration, Flight Number, FA ID
         :param params: Optional: Additional query parameters
+        :param cache_only: Optional: Only return a cached response
         :return: Dictionary from JSON response
         """
         start = (datetime.now() - timedelta(days=3)).strftime('%Y-%m-%d')
         data = {'start': start}
         url = f'{self.url}/flights/{ident.upper()}'
-        params = params.update(data) if params else data
-        return await self._get_request(url, params=params)
+        if params:
+            params.update(data)
+        else:
+            params = data
+        key = ident.upper()
+        if len(params) > 1:
+            key = f'{key}:{json.dumps(params, sort_keys=True)}'
+        return await self._cached(
+            'flights_ident', key,
+            lambda: self._get_request(url, params=params),
+            cache_only,
+        )
 
     async def flights_search(self, query: str) -> Dict[str, Any]:
         """
@@ -65,7 +227,10 @@ class FlightAware(object):
         """
         url = f'{self.url}/flights/search'
         params = {'query': query}
-        return await self._get_request(url, params=params)
+        return await self._cached(
+            'flights_search', query,
+            lambda: self._get_request(url, params=params),
+        )
 
     async def flights_map(self, fa_id: str) -> Dict[str, Any]:
         """
@@ -73,15 +238,21 @@ class FlightAware(object):
         :return: Dictionary from JSON response
         """
         url = f'{self.url}/flights/{fa_id}/map'
-        return await self._get_request(url)
+        return await self._cached(
+            'flights_map', fa_id,
+            lambda: self._get_request(url),
+        )
 
     async def operators_id(self, operator_id: str) -> Dict[str, Any]:
         """
         :param operator_id: Operator ICAO or IATA ID
         :return: Dictionary from JSON response
         """
-        url = f'{self.url}/operators/{operator_id}'
-        return await self._get_request(url)
+        url = f'{self.url}/operators/{operator_id.upper()}'
+        return await self._cached(
+            'operators_id', operator_id.upper(),
+            lambda: self._get_request(url),
+        )
 
     async def owner_ident(self, ident: str) -> Dict[str, Any]:
         """
@@ -89,4 +260,7 @@ class FlightAware(object):
         :return: Dictionary from JSON response
         """
         url = f'{self.url}/aircraft/{ident.upper()}/owner'
-        return await self._get_request(url)
+        return await self._cached(
+            'owner_ident', ident.upper(),
+            lambda: self._get_request(url),
+        )
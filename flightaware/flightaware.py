@@ -1,3 +1,5 @@
+import asyncio
+import difflib
 import discord
 import httpx
 import json
@@ -5,16 +7,21 @@ import logging
 import pathlib
 import re
 import redis.asyncio as redis
+import time
 from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from html import unescape
-from typing import List, Optional, Union
+from typing import Dict, FrozenSet, List, Optional, Pattern, Tuple, Union
 
+from discord.ext import tasks
 from redbot.core import commands, app_commands, Config
 from redbot.core.bot import Red
+from redbot.core.data_manager import cog_data_path
 from redbot.core.utils import chat_formatting as cf
+from redbot.core.utils import menus
 
 from .fa import FlightAware
+from .reghex import RegHexIndex
 
 log = logging.getLogger('red.flightaware')
 
@@ -22,18 +29,45 @@ log = logging.getLogger('red.flightaware')
 class Flightaware(commands.Cog):
     """Carl's FlightAware Cog"""
 
+    global_default = {
+        'tracking': {},
+        'budget_daily': 0.0,
+        'budget_monthly': 0.0,
+    }
     guild_default = {
         'enabled': True,
     }
+    # Seconds between polls of a tracked flight by phase
+    track_intervals = {
+        'scheduled': 60*30,
+        'departing': 60*5,
+        'enroute': 60*15,
+        'arriving': 60*5,
+    }
+    track_over_budget_interval = 60*60
+    track_max_channel = 5
+    batch_max = 20
 
     def __init__(self, bot):
         self.bot: Red = bot
         self.api_key: Optional[str] = None
+        self.fa: Optional[FlightAware] = None
         self.redis: Optional[redis.Redis] = None
         self.cog_dir = pathlib.Path(__file__).parent.resolve()
         self.config = Config.get_conf(self, 1337, True)
+        self.config.register_global(**self.global_default)
         self.config.register_guild(**self.guild_default)
-        self.reg_hex: Optional[dict] = None
+        self.reg_hex: Optional[RegHexIndex] = None
+        self.icao_codes: FrozenSet[str] = frozenset()
+        self.iata_codes: FrozenSet[str] = frozenset()
+        self.fn_matcher: Optional[Pattern] = None
+        self.aircraft_types: Dict[str, Tuple[str, str]] = {}
+        self.aircraft_names: Dict[str, List[str]] = {}
+        self.aircraft_types_hash: Optional[int] = None
+        self.warm_task: Optional[asyncio.Task] = None
+        self.auto_cooldown: Dict[Tuple[int, str], float] = {}
+        self.auto_cooldown_sec: int = 60
+        self.track_lock = asyncio.Lock()
 
     async def cog_load(self):
         log.info('%s: Cog Load Start', self.__cog_name__)
@@ -51,72 +85,80 @@ class Flightaware(commands.Cog):
         )
         log.info('Load: redis.ping')
         await self.redis.ping()
-        log.info('Load: gen_wiki_type_data')
-        try:
-            await self.gen_wiki_type_data()
-        except Exception as error:
-            log.info('Error: gen_wiki_type_data: %s', error)
+        self.fa = FlightAware(self.api_key, self.redis)
+        log.info('Load: load_aircraft_fallback')
+        self.load_aircraft_fallback()
+        self.warm_task = asyncio.create_task(self.warm_aircraft_types())
         log.info('Load: load_reg_hex')
         await self.load_reg_hex()
+        log.info('Load: load_airline_codes')
+        self.load_airline_codes()
+        self.track_loop.start()
         log.info('%s: Cog Load Finish', self.__cog_name__)
 
     async def cog_unload(self):
         log.info('%s: Cog Unload', self.__cog_name__)
+        self.types_loop.cancel()
+        self.track_loop.cancel()
+        if self.warm_task and not self.warm_task.done():
+            self.warm_task.cancel()
+        if self.reg_hex:
+            self.reg_hex.close()
 
     async def load_reg_hex(self):
         log.debug('load_reg_hex')
-        # if not await self.redis.exists('fa:reg_hex'):
-        if not self.reg_hex:
-            with open(f'{self.cog_dir}/reghex.txt', 'r') as f:
-                log.debug('OPENED REG HEX FILE')
-                self.reg_hex = json.loads(f.read())
-                # log.debug('READ REG HEX DATA TO MEMORY')
-                # await self.redis.hset('fa:reg_hex', mapping=reg_hex)
-                # log.debug('LOADED REG HEX DATA TO REDIS')
+        if self.reg_hex:
+            return
+        source = f'{self.cog_dir}/reghex.txt'
+        if not pathlib.Path(source).exists():
+            return log.warning('Missing reghex.txt, ICAO Hex lookups disabled.')
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        self.reg_hex = await loop.run_in_executor(
+            None, RegHexIndex.load, source, str(cog_data_path(self) / 'reghex.idx')
+        )
+        log.info('Loaded %s in %.3fs', self.reg_hex, time.perf_counter() - start)
+
+    def load_airline_codes(self):
+        """Parse Airline Code files into sets and compile the FN matcher."""
+        self.icao_codes = self.read_codes(f'{self.cog_dir}/icao.txt', 3)
+        self.iata_codes = self.read_codes(f'{self.cog_dir}/iata.txt', 2)
+        icao = '|'.join(sorted(self.icao_codes))
+        iata = '|'.join(sorted(self.iata_codes))
+        self.fn_matcher = re.compile(
+            rf'(?:(?P<icao>{icao})|(?P<iata>{iata}))(?P<number>[0-9]{{1,4}})'
+        )
+        log.debug('icao_codes: %s', len(self.icao_codes))
+        log.debug('iata_codes: %s', len(self.iata_codes))
+
+    @staticmethod
+    def read_codes(file: str, length: int) -> FrozenSet[str]:
+        with open(file) as f:
+            lines = [x.strip().upper() for x in f.readlines()]
+        return frozenset(x for x in lines if len(x) == length and x.isalpha())
 
     @commands.Cog.listener(name='on_message_without_command')
     async def on_message_without_command(self, message: discord.Message):
-        if message.author.bot:
+        if message.author.bot or not message.guild:
             return
-        if not message.content:
+        if not message.content or not self.fn_matcher:
             return
         if not (3 <= len(message.content) <= 7):
             return
-        split: list = message.content.split()
-        if len(split) > 1:
-            return
-        m = re.search('[a-zA-Z0-9]{2,3}[0-9]{1,4}', split[0].upper())
-        if not m or not m.group(0):
+        m = self.fn_matcher.fullmatch(message.content.strip().upper())
+        if not m:
             return
+        fn = m.group(0)
+        log.debug('FN: %s - %s', fn, 'ICAO' if m.group('icao') else 'IATA')
 
         if not await self.config.guild(message.guild).enabled():
             return log.debug('%s: Disabled', self.__cog_name__)
+        if self.is_auto_cooldown(message.channel.id, fn):
+            return log.debug('Cooldown: %s', fn)
 
-        fn = m.group(0).upper()
-        log.debug('FN: %s', fn)
-        m = re.search('[a-zA-Z]{2,3}[0-9]{1,4}', fn)
-        if not m or not m.group(0):
-            return
-
-        valid = False
-        file = f'{self.cog_dir}/icao.txt'
-        with open(file) as f:
-            if fn[:3] in f.read():
-                valid = True
-                log.debug('ICAO')
-        if not valid:
-            file = f'{self.cog_dir}/iata.txt'
-            with open(file) as f:
-                if fn[:2] in f.read():
-                    valid = True
-                    log.debug('IATA')
-        if not valid:
-            log.debug('NONE')
-            log.warning('FN Regex Match but NO Airline Code Match')
-            return
-
-        log.debug('SUCCESS: matched fn to ac')
-        await self.process_flight(message.channel, message.author, fn, silent=True)
+        cache_only = await self.is_over_budget()
+        await self.process_flight(message.channel, message.author, fn,
+                                  silent=True, cache_only=cache_only)
 
         # m = re.search('[a-zA-Z]{2,3}', fn)
         # if not m or not m.group(0):
@@ -132,6 +174,31 @@ class Flightaware(commands.Cog):
         #     if ac not in f.read():
         #         return
 
+    async def is_over_budget(self) -> bool:
+        """Check if estimated AeroAPI cost exceeds the daily or monthly budget."""
+        daily, monthly = await self.config.budget_daily(), await self.config.budget_monthly()
+        if not daily and not monthly:
+            return False
+        now = datetime.now(timezone.utc)
+        if daily and (await self.fa.usage(now.strftime('%Y-%m-%d')))['cost'] >= daily:
+            log.debug('Over daily budget: %s', daily)
+            return True
+        if monthly and (await self.fa.usage(now.strftime('%Y-%m')))['cost'] >= monthly:
+            log.debug('Over monthly budget: %s', monthly)
+            return True
+        return False
+
+    def is_auto_cooldown(self, channel_id: int, ident: str) -> bool:
+        """Check and start the auto lookup cooldown for ident in channel."""
+        now = time.monotonic()
+        if len(self.auto_cooldown) > 1000:
+            self.auto_cooldown = {k: v for k, v in self.auto_cooldown.items()
+                                  if v > now}
+        if self.auto_cooldown.get((channel_id, ident), 0) > now:
+            return True
+        self.auto_cooldown[(channel_id, ident)] = now + self.auto_cooldown_sec
+        return False
+
     @commands.hybrid_command(name='flight', aliases=['f'], description='Get Flight Information')
     async def flight(self, ctx: commands.Context, ident: str):
         """Get Flight Information for: <ident>"""
@@ -161,27 +228,44 @@ class Flightaware(commands.Cog):
         """Get Flight Information for: <ident>"""
         await self.process_flight(ctx, ctx.author, ident)
 
+    @fa.command(name='type', aliases=['aircraft'], description='Search Aircraft Types')
+    @app_commands.describe(query='ICAO Type Designator or Aircraft Name')
+    async def fa_type(self, ctx: commands.Context, *, query: str):
+        """Search Aircraft Types for: <query>"""
+        if not self.aircraft_types:
+            msg = 'Aircraft type data is not loaded yet, try again soon.'
+            return await ctx.send(msg, ephemeral=True, delete_after=15)
+        results = self.search_aircraft_types(query)
+        if not results:
+            msg = f'No aircraft types found for: **{query}**'
+            return await ctx.send(msg, ephemeral=True, delete_after=15)
+        lines = [f'`{x:<4}` [{self.get_type_name(x)}](<{self.get_wiki_url(x)}>)'
+                 for x in results]
+        await ctx.send(f'Aircraft Types for **{query}**\n' + '\n'.join(lines))
+
+    @fa.command(name='cache', description='AeroAPI Cache Statistics')
+    @commands.is_owner()
+    async def fa_cache(self, ctx: commands.Context):
+        """Show AeroAPI Cache Hit Rates per Endpoint"""
+        stats = await self.fa.cache_stats_all()
+        lines = []
+        for namespace, data in stats.items():
+            total = data['hits'] + data['misses']
+            rate = data['hits'] / total * 100 if total else 0
+            lines.append(f"{namespace:<15} {data['hits']:>7} / {total:<7} {rate:5.1f}%")
+        await ctx.send(cf.box('\n'.join(lines)))
+
     async def process_flight(self, sendable: Union[commands.Context, discord.TextChannel],
                              author: Union[discord.Member, discord.User],
-                             ident_str: str, silent=False):
+                             ident_str: str, silent=False, cache_only=False):
         ident: str = self.validate_ident(ident_str)
         if not ident:
             if silent:
                 return
             msg = f'Unable to validate `ident`: **{ident_str}**'
             return await sendable.send(msg, ephemeral=True, delete_after=15)
-        # TODO: Move this to init
-        fa = FlightAware(self.api_key)
-        fdata: dict = json.loads(await self.redis.get(f'fa:{ident}') or '{}')
-        if not fdata:
-            log.info('--- API CALL: fa')
-            fdata = await fa.flights_ident(ident)
-            log.debug(fdata)
-            await self.redis.set(
-                f'fa:{ident}',
-                json.dumps(fdata or {}),
-                timedelta(minutes=5),
-            )
+        fa = self.fa
+        fdata: dict = await fa.flights_ident(ident, cache_only=cache_only)
         if 'flights' not in fdata or not fdata['flights']:
             if silent:
                 return
@@ -272,7 +356,7 @@ class Flightaware(commands.Cog):
 
             if d['aircraft_type']:
                 type_link = f"[{d['aircraft_type']}]({fa.fa_aircraft_url}{d['aircraft_type']})"
-                type_name = await self.get_type_name(d['aircraft_type']) or 'N/A'
+                type_name = self.get_type_name(d['aircraft_type']) or 'N/A'
 
             if d['aircraft_type'] and d['registration']:
                 msgs.append(f"\n\U00002708\U0000FE0F **{type_link} - {type_name} - {d['registration']}**")
@@ -331,6 +415,258 @@ class Flightaware(commands.Cog):
         view = EmbedsView(self, author, embeds, index)
         await view.send_initial_message(sendable, content=content)
 
+    @fa.command(name='usage', description='AeroAPI Usage and Cost')
+    @commands.is_owner()
+    async def fa_usage(self, ctx: commands.Context):
+        """Show AeroAPI calls, cache hit ratios and estimated cost"""
+        now = datetime.now(timezone.utc)
+        day = await self.fa.usage(now.strftime('%Y-%m-%d'))
+        month = await self.fa.usage(now.strftime('%Y-%m'))
+        stats = await self.fa.cache_stats_all()
+        daily, monthly = await self.config.budget_daily(), await self.config.budget_monthly()
+        lines = [f"{'Endpoint':<15} {'Today':>6} {'Month':>7} {'Hit %':>6}"]
+        for namespace in self.fa.call_cost:
+            hits, misses = stats[namespace]['hits'], stats[namespace]['misses']
+            rate = hits / (hits + misses) * 100 if hits + misses else 0
+            lines.append(f"{namespace:<15} {day['calls'][namespace]:>6} "
+                         f"{month['calls'][namespace]:>7} {rate:>5.1f}%")
+        lines.extend([
+            '',
+            f"Cost Today: ${day['cost']:.2f} / {f'${daily:.2f}' if daily else 'No Budget'}",
+            f"Cost Month: ${month['cost']:.2f} / {f'${monthly:.2f}' if monthly else 'No Budget'}",
+        ])
+        over = '\n⚠️ **Over budget:** auto lookups are cache only, tracking is hourly.' if await self.is_over_budget() else ''
+        await ctx.send(cf.box('\n'.join(lines)) + over)
+
+    @fa.command(name='budget', description='Set AeroAPI Budget')
+    @commands.is_owner()
+    @app_commands.describe(period='daily or monthly', amount='Estimated USD, 0 to disable')
+    async def fa_budget(self, ctx: commands.Context, period: str, amount: float):
+        """Set the <daily> or <monthly> estimated cost budget for auto lookups"""
+        period = period.lower()
+        if period not in ['daily', 'monthly'] or amount < 0:
+            msg = '⛔ Usage: `fa budget <daily|monthly> <amount>` with amount >= 0'
+            return await ctx.send(msg, ephemeral=True, delete_after=15)
+        await getattr(self.config, f'budget_{period}').set(amount)
+        value = f'${amount:.2f}' if amount else 'Disabled'
+        await ctx.send(f'✅ AeroAPI {period.title()} Budget: **{value}**')
+
+    @fa.command(name='batch', aliases=['multi'], description='Lookup Multiple Flights')
+    @app_commands.describe(idents='Flight Numbers or Registrations separated by spaces')
+    async def fa_batch(self, ctx: commands.Context, *, idents: str):
+        """Get a Flight Summary for multiple <idents> separated by spaces"""
+        validated = (self.validate_ident(x) for x in idents.replace(',', ' ').split())
+        unique: List[str] = list(dict.fromkeys(x for x in validated if x))
+        if not unique:
+            msg = f'Unable to validate any `idents`: **{idents}**'
+            return await ctx.send(msg, ephemeral=True, delete_after=15)
+        if len(unique) > self.batch_max:
+            msg = f'⛔ Maximum of {self.batch_max} idents per batch, got {len(unique)}.'
+            return await ctx.send(msg, ephemeral=True, delete_after=15)
+
+        await ctx.typing()
+        cache_only = await self.is_over_budget()
+        cached = await asyncio.gather(*[self.fa.is_cached('flights_ident', x) for x in unique])
+        results = await asyncio.gather(*[self.fa.flights_ident(x, cache_only=cache_only) for x in unique],
+                                       return_exceptions=True)
+        lines = [f"{'Ident':<8} {'Type':<4} {'Reg':<7} {'From':<4} {'To':<4} Status"]
+        for ident, fdata, is_cached in zip(unique, results, cached):
+            if cache_only and not is_cached:
+                lines.append(f'{ident:<8} Not cached, over budget')
+                continue
+            if isinstance(fdata, Exception):
+                log.warning('Batch error for %s: %s', ident, fdata)
+                lines.append(f'{ident:<8} Error: {type(fdata).__name__}')
+                continue
+            flights = fdata.get('flights', [])
+            d = self.select_track_flight(flights) or (flights[0] if flights else None)
+            if not d:
+                lines.append(f'{ident:<8} No flights found')
+                continue
+            origin = d['origin']['code'] if d['origin'] else ''
+            destination = d['destination']['code'] if d['destination'] else ''
+            lines.append(f"{ident:<8} {d['aircraft_type'] or '':<4} {d['registration'] or '':<7} "
+                         f"{origin:<4} {destination:<4} {d['status']}")
+        message = '\n'.join(lines)
+        missed = 'skipped (over budget)' if cache_only else 'fetched'
+        footer = f'{len(unique)} idents: {sum(cached)} cached, {len(unique) - sum(cached)} {missed}'
+        pages = [f'{cf.box(page)}{footer}' for page in cf.pagify(message, delims=['\n'], page_length=1800)]
+        if len(pages) == 1:
+            return await ctx.send(pages[0])
+        await menus.menu(ctx, pages, menus.DEFAULT_CONTROLS)
+
+    @fa.command(name='track', description='Track a Flight in this Channel')
+    @app_commands.describe(ident='Flight Number or Registration Number')
+    async def fa_track(self, ctx: commands.Context, ident: str):
+        """Post status updates for flight <ident> in this channel until it lands"""
+        ident_str = ident
+        ident = self.validate_ident(ident_str)
+        if not ident:
+            msg = f'Unable to validate `ident`: **{ident_str}**'
+            return await ctx.send(msg, ephemeral=True, delete_after=15)
+        tracking: dict = await self.config.tracking()
+        channel_count = sum(ctx.channel.id in x['channels'] for x in tracking.values())
+        if channel_count >= self.track_max_channel and ident not in tracking:
+            msg = f'⛔ This channel is already tracking {channel_count} flights.'
+            return await ctx.send(msg, ephemeral=True, delete_after=15)
+
+        new_data: Optional[dict] = None
+        if ident not in tracking:
+            fdata: dict = await self.fa.flights_ident(ident)
+            d = self.select_track_flight(fdata.get('flights', []))
+            if not d:
+                msg = f'No active or upcoming flight found for: **{ident}**'
+                return await ctx.send(msg, ephemeral=True, delete_after=15)
+            phase = self.get_flight_phase(d)
+            new_data = {
+                'fa_flight_id': d['fa_flight_id'],
+                'status': d['status'],
+                'next': time.time() + self.track_intervals[phase],
+                'channels': [],
+            }
+        async with self.track_lock:
+            tracking: dict = await self.config.tracking()
+            data = tracking.setdefault(ident, new_data)
+            if not data:
+                msg = f'⛔ Flight **{ident}** stopped tracking, try again.'
+                return await ctx.send(msg, ephemeral=True, delete_after=15)
+            if ctx.channel.id not in data['channels']:
+                data['channels'].append(ctx.channel.id)
+            await self.config.tracking.set(tracking)
+        msg = (f'✅ Tracking **{ident}** `{data["fa_flight_id"]}` in this channel.\n'
+               f'Current Status: **{data["status"]}**')
+        await ctx.send(msg)
+
+    @fa.command(name='untrack', description='Stop Tracking a Flight in this Channel')
+    @app_commands.describe(ident='Tracked Flight Number or Registration Number')
+    async def fa_untrack(self, ctx: commands.Context, ident: str):
+        """Stop tracking flight <ident> in this channel"""
+        ident = (self.validate_ident(ident) or ident).upper()
+        async with self.track_lock:
+            tracking: dict = await self.config.tracking()
+            if ident not in tracking or ctx.channel.id not in tracking[ident]['channels']:
+                msg = f'⛔ Flight **{ident}** is not tracked in this channel.'
+                return await ctx.send(msg, ephemeral=True, delete_after=15)
+            tracking[ident]['channels'].remove(ctx.channel.id)
+            if not tracking[ident]['channels']:
+                del tracking[ident]
+            await self.config.tracking.set(tracking)
+        await ctx.send(f'✅ Stopped tracking **{ident}** in this channel.')
+
+    @fa.command(name='tracking', description='List Flights Tracked in this Channel')
+    async def fa_tracking(self, ctx: commands.Context):
+        """List flights tracked in this channel"""
+        tracking: dict = await self.config.tracking()
+        lines = [f'**{k}** `{v["fa_flight_id"]}` - {v["status"]}'
+                 for k, v in tracking.items() if ctx.channel.id in v['channels']]
+        if not lines:
+            return await ctx.send('No flights tracked in this channel.', ephemeral=True, delete_after=15)
+        await ctx.send('Tracked Flights:\n' + '\n'.join(lines))
+
+    @tasks.loop(minutes=1.0)
+    async def track_loop(self):
+        await self.bot.wait_until_ready()
+        tracking: dict = await self.config.tracking()
+        now = time.time()
+        due = {k: v for k, v in tracking.items() if v['next'] <= now}
+        if not due:
+            return
+        over_budget = await self.is_over_budget()
+        polled = {}
+        for ident, data in due.items():
+            try:
+                await self.poll_tracked_flight(ident, data)
+            except Exception as error:
+                log.error('Error polling tracked flight %s: %s', ident, error)
+                data['next'] = now + self.track_intervals['departing']
+            if over_budget:
+                data['next'] = max(data['next'], now + self.track_over_budget_interval)
+            polled[ident] = data
+        if not polled:
+            return
+        async with self.track_lock:
+            tracking: dict = await self.config.tracking()
+            for ident, data in polled.items():
+                if ident not in tracking:
+                    continue
+                channels = [x for x in tracking[ident]['channels'] if self.bot.get_channel(x)]
+                if not data['channels'] or not channels:
+                    del tracking[ident]
+                    continue
+                tracking[ident]['channels'] = channels
+                tracking[ident]['status'] = data['status']
+                tracking[ident]['next'] = data['next']
+            await self.config.tracking.set(tracking)
+
+    async def poll_tracked_flight(self, ident: str, data: dict):
+        """Poll one tracked flight once for all subscribers and push changes."""
+        log.debug('poll_tracked_flight: %s', ident)
+        fdata: dict = await self.fa.flights_ident(ident)
+        flights = fdata.get('flights', [])
+        d = next((x for x in flights if x['fa_flight_id'] == data['fa_flight_id']), None)
+        if not d:
+            await self.send_track_update(data, f'⛔ Flight **{ident}** is no longer available, tracking stopped.')
+            data['channels'] = []
+            return
+        phase = self.get_flight_phase(d)
+        if d['status'] != data['status'] or phase == 'landed':
+            data['status'] = d['status']
+            await self.send_track_update(data, self.get_track_message(d, phase))
+        if phase == 'landed':
+            data['channels'] = []
+            return
+        data['next'] = time.time() + self.track_intervals[phase]
+
+    async def send_track_update(self, data: dict, content: str):
+        for channel_id in list(data['channels']):
+            channel: discord.TextChannel = self.bot.get_channel(channel_id)
+            if not channel:
+                data['channels'].remove(channel_id)
+                continue
+            try:
+                await channel.send(content, allowed_mentions=discord.AllowedMentions.none())
+            except discord.HTTPException as error:
+                log.warning('Error sending track update to %s: %s', channel_id, error)
+
+    def get_track_message(self, d: dict, phase: str) -> str:
+        origin = d['origin']['code'] if d['origin'] else '?'
+        destination = d['destination']['code'] if d['destination'] else '?'
+        url = f"{self.fa.fa_id_url}{d['fa_flight_id']}"
+        msg = f"\U00002708\U0000FE0F [{d['ident']}](<{url}>) {origin} → {destination}: **{d['status']}**"
+        if phase == 'landed':
+            return f'{msg}\nFlight complete, tracking stopped.'
+        if d['progress_percent']:
+            msg += f" - {d['progress_percent']}%"
+        return msg
+
+    @staticmethod
+    def parse_fa_time(value: Optional[str]) -> Optional[datetime]:
+        if not value:
+            return None
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+
+    def get_flight_phase(self, d: dict) -> str:
+        """Get flight phase: scheduled, departing, enroute, arriving or landed."""
+        if d['actual_on'] or d['actual_in'] or d['cancelled']:
+            return 'landed'
+        if d['actual_off']:
+            return 'arriving' if (d['progress_percent'] or 0) >= 75 else 'enroute'
+        depart = self.parse_fa_time(d['estimated_out'] or d['scheduled_out']
+                                    or d['estimated_off'] or d['scheduled_off'])
+        if depart and depart - datetime.now(timezone.utc) < timedelta(hours=1):
+            return 'departing'
+        return 'scheduled'
+
+    def select_track_flight(self, flights: List[dict]) -> Optional[dict]:
+        """Select the airborne flight or the next departing flight."""
+        for d in flights:
+            if d['actual_off'] and not d['actual_on'] and not d['cancelled']:
+                return d
+        upcoming = [d for d in flights if not d['actual_off'] and not d['cancelled']
+                    and (d['scheduled_out'] or d['scheduled_off'])]
+        if upcoming:
+            return min(upcoming, key=lambda x: x['scheduled_out'] or x['scheduled_off'])
+
     @fa.command(name='operator', description='Airline Operator Information')
     @app_commands.describe(code='Airline ICAO or IATA Identifier')
     async def fa_operator(self, ctx: commands.Context, code: str):
@@ -342,22 +678,12 @@ class Flightaware(commands.Cog):
             msg = f'Unable to validate `id`: **{code}**'
             return await ctx.send(msg, ephemeral=True, delete_after=10)
 
-        fa = FlightAware(self.api_key)
-        fdata = json.loads(await self.redis.get(f'fa:{operator_id}') or '{}')
+        fdata = await self.fa.operators_id(operator_id)
         log.debug(fdata)
-        if not fdata:
-            log.info('--- API CALL: fa')
-            fdata = await fa.operators_id(operator_id)
-            log.debug(fdata)
         if not fdata:
             msg = f'No results for operator id: `{operator_id}`'
             return await ctx.send(msg, ephemeral=True, delete_after=10)
 
-        await self.redis.set(
-            f'fa:{operator_id}',
-            json.dumps(fdata),
-            timedelta(days=30),
-        )
         d = fdata
         msgs = [(
             f"Operator: **{d['name']}** "
@@ -389,21 +715,12 @@ class Flightaware(commands.Cog):
         if not identifier:
             return await ctx.send(f'Unable to validate `id`: **{ident}**', ephemeral=True, delete_after=10)
 
-        fa = FlightAware(self.api_key)
-        fdata = json.loads(await self.redis.get(f'fa:{identifier}') or '{}')
+        fa = self.fa
+        fdata = await fa.owner_ident(identifier)
         log.debug(fdata)
-        if not fdata:
-            log.info('--- API CALL: fa')
-            fdata = await fa.owner_ident(identifier)
-            log.debug(fdata)
-        if not fdata:
+        if not fdata or not fdata.get('owner'):
             return await ctx.send(f'No results for ident: `{identifier}`', ephemeral=True, delete_after=10)
 
-        await self.redis.set(
-            f'fa:{identifier}',
-            json.dumps(fdata),
-            timedelta(days=30),
-        )
         d = fdata['owner']
         msg = (
             f"Registration: **{identifier}** "
@@ -423,28 +740,83 @@ class Flightaware(commands.Cog):
         view = ButtonsURLView(buttons)
         await ctx.send(unescape(msg), view=view)
 
-    async def get_type_name(self, icao_type: str) -> Optional[str]:
+    def load_aircraft_fallback(self):
+        """Load the bundled aircraft type snapshot until fresh data arrives."""
         try:
-            wiki_data = await self.redis.get('fa:wiki_aircraft_type') or await self.gen_wiki_type_data()
-            aircraft_data: dict = json.loads(wiki_data)
-            if aircraft_data and icao_type in aircraft_data:
-                return aircraft_data[icao_type][0]
+            with open(f'{self.cog_dir}/aircraft_types.json') as f:
+                self.set_aircraft_types(json.loads(f.read()))
         except Exception as error:
-            log.exception(error)
-
-    async def get_wiki_url(self, icao_type: str) -> Optional[str]:
-        icao_type = icao_type.upper()
-        base_url = 'https://en.wikipedia.org'
+            log.warning('Error loading aircraft_types.json: %s', error)
+
+    async def warm_aircraft_types(self, delay: int = 30, max_delay: int = 60*30):
+        """Load aircraft types from Redis or Wikipedia with retry and backoff."""
+        while True:
+            try:
+                await self.refresh_aircraft_types()
+                break
+            except Exception as error:
+                log.warning('Error warming aircraft types, retry in %ss: %s',
+                            delay, error)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+        self.types_loop.start()
+
+    @tasks.loop(minutes=30.0)
+    async def types_loop(self):
+        log.debug('%s: Run Loop: types_loop', self.__cog_name__)
         try:
-            wiki_data = await self.redis.get('fa:wiki_aircraft_type') or await self.gen_wiki_type_data()
-            aircraft_data: dict = json.loads(wiki_data)
-            if aircraft_data and icao_type in aircraft_data:
-                return f'{base_url}{aircraft_data[icao_type][1]}'
+            await self.refresh_aircraft_types()
         except Exception as error:
-            log.exception(error)
+            log.error('Error refreshing aircraft types: %s', error)
+
+    @types_loop.before_loop
+    async def before_types_loop(self):
+        # warm_aircraft_types just refreshed, wait one interval for the first run
+        await asyncio.sleep(self.types_loop.minutes * 60)
+
+    async def refresh_aircraft_types(self):
+        """Decode the Redis aircraft type table if it changed or regenerate it."""
+        wiki_data: Optional[str] = await self.redis.get('fa:wiki_aircraft_type')
+        if not wiki_data:
+            await self.gen_wiki_type_data()
+            return
+        if hash(wiki_data) != self.aircraft_types_hash:
+            log.debug('Decoding changed aircraft type table')
+            self.set_aircraft_types(json.loads(wiki_data))
+            self.aircraft_types_hash = hash(wiki_data)
+
+    def set_aircraft_types(self, aircraft_data: dict):
+        types = {k.upper(): (v[0], v[1]) for k, v in aircraft_data.items()}
+        names: Dict[str, List[str]] = {}
+        for icao_type, (type_name, _) in types.items():
+            names.setdefault(type_name.lower(), []).append(icao_type)
+        self.aircraft_types, self.aircraft_names = types, names
+        log.info('Aircraft Types: %s', len(self.aircraft_types))
+
+    def get_type_name(self, icao_type: str) -> Optional[str]:
+        if data := self.aircraft_types.get(icao_type.upper()):
+            return data[0]
+
+    def get_wiki_url(self, icao_type: str) -> Optional[str]:
+        base_url = 'https://en.wikipedia.org'
+        if data := self.aircraft_types.get(icao_type.upper()):
+            return f'{base_url}{data[1]}'
+
+    def search_aircraft_types(self, query: str, limit: int = 10) -> List[str]:
+        """Fuzzy search aircraft types by ICAO type code or name."""
+        code, name = query.strip().upper(), query.strip().lower()
+        results: List[str] = [code] if code in self.aircraft_types else []
+        for type_name, codes in self.aircraft_names.items():
+            if name in type_name:
+                results.extend(codes)
+        if len(results) < limit:
+            for match in difflib.get_close_matches(code, self.aircraft_types, limit, 0.6):
+                results.append(match)
+            for match in difflib.get_close_matches(name, self.aircraft_names, limit, 0.6):
+                results.extend(self.aircraft_names[match])
+        return list(dict.fromkeys(results))[:limit]
 
     async def gen_wiki_type_data(self) -> dict:
-        # TODO: Make this a task in a loop
         log.debug('...gen_wiki_type_data...')
         url = 'https://en.wikipedia.org/wiki/List_of_aircraft_type_designators'
         http_options = {
@@ -456,7 +828,20 @@ class Flightaware(commands.Cog):
             headers = {'User-Agent': 'carl-cogs/1.0 (https://github.com/smashedr/carl-cogs)'}
             r = await client.get(url, headers=headers)
             r.raise_for_status()
-        html = r.text
+        loop = asyncio.get_running_loop()
+        aircraft_data = await loop.run_in_executor(None, self.parse_wiki_types, r.text)
+        wiki_data = json.dumps(aircraft_data)
+        await self.redis.set(
+            'fa:wiki_aircraft_type',
+            wiki_data,
+            timedelta(days=30),
+        )
+        self.set_aircraft_types(aircraft_data)
+        self.aircraft_types_hash = hash(wiki_data)
+        return aircraft_data
+
+    @staticmethod
+    def parse_wiki_types(html: str) -> dict:
         soup = BeautifulSoup(html, 'html.parser')
         rows = soup.find('table').find('tbody').find_all('tr')
         aircraft_data = {}
@@ -468,13 +853,6 @@ class Flightaware(commands.Cog):
             model_href = columns[2].find('a')['href']
             type_name = columns[2].find('a').text
             aircraft_data[icao_type] = [type_name, model_href]
-        # log.debug('-'*20)
-        # log.debug(aircraft_data)
-        await self.redis.set(
-            'fa:wiki_aircraft_type',
-            json.dumps(aircraft_data),
-            timedelta(days=30),
-        )
         return aircraft_data
 
     @staticmethod
@@ -515,7 +893,7 @@ class Flightaware(commands.Cog):
         reg = registration.strip().replace('-', '').upper()
         log.debug('_get_icao_hex: reg: %s', reg)
         if self.reg_hex:
-            return self.reg_hex.get(reg)
+            return self.reg_hex.get_hex(reg)
 
         # cache: str = await self.redis.get(f'pdb:{registration}')
         # if cache:
@@ -573,7 +951,7 @@ class Flightaware(commands.Cog):
             return ''
         links = []
         # links.append(f"[FA]({fa.fa_aircraft_url}{d['aircraft_type']})")
-        if wiki_url := await self.get_wiki_url(d['aircraft_type']):
+        if wiki_url := self.get_wiki_url(d['aircraft_type']):
             links.append(f"[Wikipedia]({wiki_url})")
         return ' | '.join(links)
 
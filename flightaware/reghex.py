@@ -0,0 +1,127 @@
+import bisect
+import json
+import mmap
+import os
+import struct
+from typing import Optional
+
+
+class RegHexIndex(object):
+    """
+    Memory-mapped Registration <-> ICAO Hex index built from reghex.txt
+
+    File layout, all integers little-endian:
+        header:  magic(4) count(uint32) width(uint32)
+        by_reg:  count * [registration(width) hex(uint32)] sorted by reg
+        by_hex:  count * [hex(uint32) position(uint32)] sorted by hex
+
+    :param path: Path to the index file, built with RegHexIndex.build
+    """
+    magic = b'RGX1'
+    header = struct.Struct('<4sII')
+    hex_row = struct.Struct('<II')
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.width = self.header.unpack_from(self._mm, 0)
+        if magic != self.magic:
+            self.close()
+            raise ValueError(f'Invalid RegHex index file: {path}')
+        self.reg_row = struct.Struct(f'<{self.width}sI')
+        self.reg_offset = self.header.size
+        self.hex_offset = self.reg_offset + self.count * self.reg_row.size
+        self._regs = _Column(self, self._reg_key)
+        self._hexes = _Column(self, self._hex_key)
+
+    def __repr__(self):
+        return f'RegHexIndex(path={self.path!r}, count={self.count})'
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    @classmethod
+    def build(cls, source: str, path: str) -> None:
+        """
+        :param source: Path to reghex.txt JSON mapping of registration: hex
+        :param path: Path to write the index file
+        """
+        with open(source, 'r') as f:
+            data: dict = json.loads(f.read())
+        rows = []
+        for reg, icao_hex in data.items():
+            try:
+                rows.append((reg.encode(), int(icao_hex, 16)))
+            except (ValueError, TypeError, AttributeError):
+                continue
+        del data
+        rows.sort()
+        width = max((len(r[0]) for r in rows), default=1)
+        reg_row = struct.Struct(f'<{width}sI')
+        by_hex = sorted((h, i) for i, (_, h) in enumerate(rows))
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(cls.header.pack(cls.magic, len(rows), width))
+            f.write(b''.join(reg_row.pack(r, h) for r, h in rows))
+            f.write(b''.join(cls.hex_row.pack(h, i) for h, i in by_hex))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, source: str, path: str) -> 'RegHexIndex':
+        """Build the index if missing or older than source, then open it."""
+        if not os.path.exists(path) or \
+                os.path.getmtime(path) < os.path.getmtime(source):
+            cls.build(source, path)
+        return cls(path)
+
+    def _reg_key(self, i: int) -> bytes:
+        offset = self.reg_offset + i * self.reg_row.size
+        return self._mm[offset:offset + self.width].rstrip(b'\x00')
+
+    def _hex_key(self, i: int) -> int:
+        offset = self.hex_offset + i * self.hex_row.size
+        return self.hex_row.unpack_from(self._mm, offset)[0]
+
+    def get_hex(self, registration: str) -> Optional[str]:
+        """
+        :param registration: Registration without dashes, upper case
+        :return: ICAO Hex string or None
+        """
+        key = registration.encode()
+        i = bisect.bisect_left(self._regs, key)
+        if i < self.count and self._reg_key(i) == key:
+            offset = self.reg_offset + i * self.reg_row.size
+            return f'{self.reg_row.unpack_from(self._mm, offset)[1]:06x}'
+
+    def get_reg(self, icao_hex: str) -> Optional[str]:
+        """
+        :param icao_hex: ICAO Hex string
+        :return: Registration without dashes or None
+        """
+        try:
+            key = int(icao_hex, 16)
+        except ValueError:
+            return None
+        i = bisect.bisect_left(self._hexes, key)
+        if i < self.count and self._hex_key(i) == key:
+            offset = self.hex_offset + i * self.hex_row.size
+            position = self.hex_row.unpack_from(self._mm, offset)[1]
+            return self._reg_key(position).decode()
+
+
+class _Column(object):
+    """Read-only sequence over one sorted column of the index for bisect"""
+    def __init__(self, index: RegHexIndex, getter):
+        self.index = index
+        self.getter = getter
+
+    def __len__(self):
+        return self.index.count
+
+    def __getitem__(self, i: int):
+        return self.getter(i)
@@ -0,0 +1,108 @@
+import asyncio
+import functools
+import json
+import logging
+import redis.asyncio as redis
+from geopy.geocoders import Nominatim
+from geopy.location import Location
+from typing import Any, Callable, Dict, Optional
+
+log = logging.getLogger('red.geotools')
+
+
+class Geocoder(object):
+    """
+    Cached Nominatim geocoder, shared rate limit across all cogs using Redis
+
+    Copies in weather, sunsetrise and geotools share the same Redis keys, keep
+    the key format and rate limit identical when changing one.
+
+    :param redis_client: Redis client with decode_responses=False or True
+    :param user_agent: Nominatim user agent
+    :param ttl: Seconds to cache found results
+    :param not_found_ttl: Seconds to cache empty results
+    """
+    prefix = 'geocode'
+    rate_key = 'geocode:ratelimit'
+    rate_ms = 1000  # Nominatim usage policy: 1 request per second
+    max_wait = 30
+
+    def __init__(self, redis_client: redis.Redis, user_agent: str,
+                 ttl: int = 60*60*24*30, not_found_ttl: int = 60*60*24):
+        self.redis = redis_client
+        self.gl = Nominatim(user_agent=user_agent)
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self.lock = asyncio.Lock()
+
+    def __repr__(self):
+        return f'Geocoder(user_agent={self.gl.headers.get("User-Agent")!r})'
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return ' '.join(query.lower().replace(',', ' ').split())
+
+    async def geocode(self, query: str) -> Optional[Location]:
+        """
+        :param query: Free form location query
+        :return: geopy Location or None
+        """
+        key = f'{self.prefix}:q:{self.normalize(query)}'
+        return await self._cached(key, self.gl.geocode, query)
+
+    async def reverse(self, lat: float, lon: float) -> Optional[Location]:
+        """
+        :param lat: Latitude
+        :param lon: Longitude
+        :return: geopy Location or None
+        """
+        key = f'{self.prefix}:r:{lat:.4f},{lon:.4f}'
+        return await self._cached(key, self.gl.reverse, (lat, lon))
+
+    async def _cached(self, key: str, func: Callable, *args) -> Optional[Location]:
+        cached = await self.redis.get(key)
+        if cached is not None:
+            return self.loads(cached)
+        async with self.lock:
+            # queued callers for the same query are answered by the first
+            cached = await self.redis.get(key)
+            if cached is not None:
+                return self.loads(cached)
+            if not await self.wait_turn():
+                log.warning('Geocoder: Rate limit wait exceeded %ss: %s', self.max_wait, key)
+                return None
+            log.debug('Geocoder: lookup %s', key)
+            loop = asyncio.get_running_loop()
+            location: Optional[Location] = await loop.run_in_executor(
+                None, functools.partial(func, *args, timeout=10))
+        ttl = self.ttl if location else self.not_found_ttl
+        await self.redis.setex(key, ttl, self.dumps(location))
+        return location
+
+    async def wait_turn(self) -> bool:
+        """Take the single global token, False if not available within max_wait."""
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while asyncio.get_running_loop().time() < deadline:
+            if await self.redis.set(self.rate_key, 1, nx=True, px=self.rate_ms):
+                return True
+            pttl = await self.redis.pttl(self.rate_key)
+            await asyncio.sleep(max(pttl, 50) / 1000)
+        return False
+
+    @staticmethod
+    def dumps(location: Optional[Location]) -> str:
+        if not location:
+            return '{}'
+        data: Dict[str, Any] = {
+            'address': location.address,
+            'point': [location.latitude, location.longitude],
+            'raw': location.raw,
+        }
+        return json.dumps(data)
+
+    @staticmethod
+    def loads(value: str) -> Optional[Location]:
+        data = json.loads(value)
+        if not data:
+            return None
+        return Location(data['address'], tuple(data['point']), data['raw'])
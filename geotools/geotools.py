@@ -1,14 +1,17 @@
+import asyncio
 import datetime
 import discord
 import geopy
 import logging
+import redis.asyncio as redis
 from geopy.distance import geodesic
-from geopy.geocoders import Nominatim
 from timezonefinder import TimezoneFinder
 from typing import Any, Dict, Optional, Tuple, Union
 
 from redbot.core import commands
 
+from .geocode import Geocoder
+
 log = logging.getLogger('red.geotools')
 
 
@@ -17,11 +20,21 @@ class GeoTools(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self.gl = Nominatim(user_agent=self.__cog_name__)
+        self.redis: Optional[redis.Redis] = None
+        self.geo: Optional[Geocoder] = None
         self.tf = TimezoneFinder()
 
     async def cog_load(self):
         log.info('%s: Cog Load Start', self.__cog_name__)
+        redis_data: dict = await self.bot.get_shared_api_tokens('redis')
+        self.redis = redis.Redis(
+            host=redis_data.get('host', 'redis'),
+            port=int(redis_data.get('port', 6379)),
+            db=int(redis_data.get('db', 0)),
+            password=redis_data.get('pass', None),
+        )
+        await self.redis.ping()
+        self.geo = Geocoder(self.redis, self.__cog_name__)
         log.info('%s: Cog Load Finish', self.__cog_name__)
 
     async def cog_unload(self):
@@ -41,13 +54,11 @@ class GeoTools(commands.Cog):
         if len(split) != 2:
             return await ctx.send(f'⛔  Need 2 locations, seperated by " to ". Not: `{location}`')
 
-        loc1 = split[0].strip()
-        geo1 = self.gl.geocode(loc1)
+        loc1, loc2 = split[0].strip(), split[1].strip()
+        geo1, geo2 = await asyncio.gather(self.geo.geocode(loc1), self.geo.geocode(loc2))
         if not geo1 or not geo1.latitude or not geo1.longitude:
             return await ctx.send(f'⛔  Error getting Geo Data for: {loc1}')
 
-        loc2 = split[1].strip()
-        geo2 = self.gl.geocode(loc2)
         if not geo2 or not geo2.latitude or not geo2.longitude:
             return await ctx.send(f'⛔  Error getting Geo Data for: {loc2}')
 
@@ -0,0 +1,71 @@
+import discord
+import io
+import logging
+from collections import OrderedDict
+from typing import List, Tuple
+
+log = logging.getLogger('red.reactpost')
+
+
+class AttachmentCache(object):
+    """
+    Bounded LRU of downloaded Attachment bytes for recent Messages.
+
+    A Message can be reposted to several mapped channels, this avoids
+    downloading its Attachments again for each one.
+    """
+
+    def __init__(self, max_messages: int = 1000,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 max_file: int = 8 * 1024 * 1024):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.max_file = max_file
+        self.size: int = 0
+        self.files: OrderedDict[int, List[Tuple[int, bytes]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    async def add(self, message: discord.Message):
+        """Download and cache the Attachments of a Message."""
+        if message.id in self.files or not message.attachments:
+            return
+        files = []
+        for attachment in message.attachments:
+            if attachment.size > self.max_file:
+                continue
+            try:
+                data = await attachment.read()
+            except discord.HTTPException as error:
+                log.warning('Error reading attachment: %s', error)
+                continue
+            files.append((attachment.id, data))
+            self.size += len(data)
+        self.files[message.id] = files
+        self.trim()
+
+    def pop(self, message_id: int) -> None:
+        for _, data in self.files.pop(message_id, []):
+            self.size -= len(data)
+
+    def trim(self) -> None:
+        while self.files and (len(self.files) > self.max_messages
+                              or self.size > self.max_bytes):
+            _, files = self.files.popitem(last=False)
+            for _, data in files:
+                self.size -= len(data)
+
+    async def get_files(self, message: discord.Message) -> List[discord.File]:
+        """Get Files for a Message, reusing cached Attachment bytes."""
+        cached = dict(self.files.get(message.id, []))
+        files = []
+        for attachment in message.attachments:
+            if attachment.id in cached:
+                fp = io.BytesIO(cached[attachment.id])
+                files.append(discord.File(fp, filename=attachment.filename,
+                                          spoiler=attachment.is_spoiler(),
+                                          description=attachment.description))
+            else:
+                files.append(await attachment.to_file())
+        return files
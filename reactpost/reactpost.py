@@ -7,6 +7,8 @@ from redbot.core import Config, checks, commands
 from redbot.core.utils import can_user_send_messages_in
 from redbot.core.utils import chat_formatting as cf
 
+from .cache import AttachmentCache
+
 log = logging.getLogger('red.reactpost')
 
 
@@ -22,6 +24,7 @@ class ReactPost(commands.Cog):
         self.bot = bot
         self.config = Config.get_conf(self, 1337, True)
         self.config.register_guild(**self.guild_default)
+        self.cache = AttachmentCache()
 
     async def cog_load(self):
         log.info('%s: Cog Load Start', self.__cog_name__)
@@ -49,6 +52,12 @@ class ReactPost(commands.Cog):
         # log.debug('maps: %s', maps)
         for emoji in maps:
             await message.add_reaction(emoji)
+        await self.cache.add(message)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        """Drop deleted messages from the cache"""
+        self.cache.pop(payload.message_id)
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
@@ -73,7 +82,10 @@ class ReactPost(commands.Cog):
             return await self.config.guild(guild).maps.set(maps)
 
         source: discord.TextChannel = guild.get_channel(payload.channel_id)
-        message: discord.Message = await source.fetch_message(payload.message_id)
+        # reaction counts on messages in the bot cache are kept current by the gateway
+        message: Optional[discord.Message] = discord.utils.get(self.bot.cached_messages, id=payload.message_id)
+        if not message:
+            message = await source.fetch_message(payload.message_id)
         if not can_user_send_messages_in(payload.member, channel):
             return await self.temporary_react(message, guild.me, '\U000026D4')
 
@@ -86,9 +98,7 @@ class ReactPost(commands.Cog):
                 if reaction.count > 2:
                     return await self.temporary_react(message, guild.me, '\U000026D4')
 
-        files = []
-        for attachment in message.attachments:
-            files.append(await attachment.to_file())
+        files = await self.cache.get_files(message)
         embeds: List[discord.Embed] = [e for e in message.embeds if e.type == 'rich']
         content = f'**ReactPost** from {message.jump_url} by {payload.member.mention}\n{message.content}'
         await channel.send(content, embeds=embeds, files=files, silent=True,
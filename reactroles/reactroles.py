@@ -3,6 +3,7 @@ import discord
 import logging
 import re
 import emojis
+from typing import Dict, Tuple, Union
 
 from redbot.core import commands, Config
 from redbot.core.utils.menus import start_adding_reactions
@@ -24,14 +25,51 @@ class Reactroles(commands.Cog):
         self.bot = bot
         self.config = Config.get_conf(self, 1337, True)
         self.config.register_guild(**self.guild_default)
+        self.index: Dict[Tuple[int, int, int], Dict[str, int]] = {}
 
     async def cog_load(self):
         log.info('%s: Cog Load Start', self.__cog_name__)
+        all_guilds: dict = await self.config.all_guilds()
+        self.index = {}
+        for guild_id, data in all_guilds.items():
+            self.index.update(self.gen_index(int(guild_id), data))
+        log.info('%s: Indexed %s messages', self.__cog_name__, len(self.index))
         log.info('%s: Cog Load Finish', self.__cog_name__)
 
     async def cog_unload(self):
         log.info('%s: Cog Unload', self.__cog_name__)
 
+    @staticmethod
+    def emoji_key(emoji: Union[discord.PartialEmoji, str]) -> str:
+        """Normalize an Emoji to an Index Key: custom id or unicode."""
+        if isinstance(emoji, discord.PartialEmoji):
+            if emoji.id:
+                return str(emoji.id)
+            emoji = emoji.name
+        match = re.match(r'<a?:\w+:(\d+)>', emoji)
+        if match:
+            return match.group(1)
+        return emojis.encode(emoji).strip('\N{VARIATION SELECTOR-16}')
+
+    @classmethod
+    def gen_index(cls, guild_id: int, data: dict) -> dict:
+        """Generate Index Entries for a Guild from its Config data."""
+        index = {}
+        for cm_id, name in data.get('at', {}).items():
+            rr = data.get('rr', {}).get(name)
+            if not rr:
+                continue
+            channel_id, message_id = cm_id.split('-')
+            key = (guild_id, int(channel_id), int(message_id))
+            index[key] = {cls.emoji_key(e): int(r) for e, r in rr.items()}
+        return index
+
+    async def update_index(self, guild: discord.Guild):
+        data = await self.config.guild(guild).all()
+        index = {k: v for k, v in self.index.items() if k[0] != guild.id}
+        index.update(self.gen_index(guild.id, data))
+        self.index = index
+
     async def get_rr(self, guild, name):
         config = await self.config.guild(guild).rr()
         config = config[name] if name in config else None
@@ -41,6 +79,7 @@ class Reactroles(commands.Cog):
         config = await self.config.guild(guild).rr()
         config[name] = data
         await self.config.guild(guild).rr.set(config)
+        await self.update_index(guild)
 
     async def get_at(self, guild, cm_id):
         config = await self.config.guild(guild).at()
@@ -51,6 +90,7 @@ class Reactroles(commands.Cog):
         config = await self.config.guild(guild).at()
         config[cm_id] = data
         await self.config.guild(guild).at.set(config)
+        await self.update_index(guild)
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
@@ -61,6 +101,10 @@ class Reactroles(commands.Cog):
         await self.process_reaction(payload)
 
     async def process_reaction(self, payload: discord.RawReactionActionEvent):
+        key = (payload.guild_id, payload.channel_id, payload.message_id)
+        rr = self.index.get(key)
+        if not rr:
+            return
         guild = self.bot.get_guild(payload.guild_id)
         if not guild:
             log.debug('No guild')
@@ -79,28 +123,10 @@ class Reactroles(commands.Cog):
             log.debug('Bot')
             return
 
-        cm_id = f'{payload.channel_id}-{payload.message_id}'
-        attach_name = await self.get_at(guild, cm_id)
-        if not attach_name:
-            log.debug('NO attach_name')
-            return
-        log.debug(attach_name)
-
-        emoji_string = str(payload.emoji).strip("\N{VARIATION SELECTOR-16}")
-        log.debug(emoji_string)
-        emoji = await self.verify_emoji(payload.emoji.id or emoji_string)
-        log.debug(emoji)
-
-        rr = await self.get_rr(guild, attach_name)
-        if not rr:
-            log.debug('NO role_id')
-            return
-        log.debug(rr)
-        if str(emoji) not in rr:
+        role_id = rr.get(self.emoji_key(payload.emoji))
+        if not role_id:
             log.warning('React Role attached but non-matched emoji used.')
             return
-
-        role_id = rr[str(emoji)]
         log.debug(role_id)
 
         if role_id in [r.id for r in member.roles]:
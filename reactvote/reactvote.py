@@ -1,10 +1,12 @@
 import discord
 import logging
-from typing import List, Optional, Union
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
 
 from redbot.core import app_commands, commands, Config
 from redbot.core.utils import chat_formatting as cf
 
+
 log = logging.getLogger('red.reactvote')
 
 
@@ -26,13 +28,48 @@ class ReactVote(commands.Cog):
         self.bot = bot
         self.config = Config.get_conf(self, 1337, True)
         self.config.register_guild(**self.guild_default)
+        self.settings: Dict[int, dict] = {}
+        self.tallies: OrderedDict[int, List[int]] = OrderedDict()
+        self.tallies_max: int = 5000
 
     async def cog_load(self):
         log.info('%s: Cog Load', self.__cog_name__)
+        all_guilds: dict = await self.config.all_guilds()
+        for guild_id, data in all_guilds.items():
+            self.settings[int(guild_id)] = data
 
     async def cog_unload(self):
         log.info('%s: Cog Unload', self.__cog_name__)
 
+    async def get_settings(self, guild: discord.Guild) -> dict:
+        if guild.id not in self.settings:
+            self.settings[guild.id] = await self.config.guild(guild).all()
+        return self.settings[guild.id]
+
+    async def refresh_settings(self, guild: discord.Guild) -> dict:
+        self.settings[guild.id] = await self.config.guild(guild).all()
+        return self.settings[guild.id]
+
+    def set_tally(self, message_id: int, tally: List[int]) -> List[int]:
+        self.tallies[message_id] = tally
+        self.tallies.move_to_end(message_id)
+        while len(self.tallies) > self.tallies_max:
+            self.tallies.popitem(last=False)
+        return tally
+
+    def is_bot(self, guild: discord.Guild, user_id: int) -> bool:
+        user = guild.get_member(user_id) or self.bot.get_user(user_id)
+        return bool(user and user.bot)
+
+    @commands.Cog.listener()
+    async def on_message_without_command(self, message: discord.Message):
+        """Start an empty tally for new messages in enabled channels"""
+        if not message.guild or message.author.bot:
+            return
+        config: dict = await self.get_settings(message.guild)
+        if config['enabled'] and message.channel.id in config['channels']:
+            self.set_tally(message.id, [0, 0])
+
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
         """Watch for reactions added to a message in an enabled channel"""
@@ -45,11 +82,9 @@ class ReactVote(commands.Cog):
         log.debug('guild: %s', guild)
         if not guild:
             return log.debug('no guild')
-        config: dict = await self.config.guild(guild).all()
-        log.debug('config: %s', config)
+        config: dict = await self.get_settings(guild)
         if not config['enabled']:
             return log.debug('config.enabled: %s', config['enabled'])
-        log.debug('config.channels: %s', config['channels'])
         if payload.channel_id not in config['channels']:
             return log.debug('channel not enabled')
         if payload.message_id in config['last']:
@@ -61,18 +96,44 @@ class ReactVote(commands.Cog):
         log.debug('channel: %s', channel)
         if not channel:
             return log.debug('no channel')
-        log.debug('payload.message_id: %s', payload.message_id)
-        message: discord.Message = await channel.fetch_message(payload.message_id)
-        log.debug('message: %s', message)
+
+        message: Optional[discord.Message] = None
+        tally = self.tallies.get(payload.message_id)
+        if tally is None:
+            # unseen message, seed the tally once from its current reactions
+            message = await self.get_message(channel, payload.message_id)
+            upvotes = await self.count_reactions(message, config['icons'][0])
+            downvotes = await self.count_reactions(message, config['icons'][1])
+            tally = self.set_tally(message.id, [upvotes, downvotes])
+        else:
+            tally[config['icons'].index(str(payload.emoji))] += 1
+        log.debug('tally: %s', tally)
+        if abs(tally[0] - tally[1]) < config['votes']:
+            return
         if not message:
-            return log.debug('no message')
-        await self.process_message(message, config)
-
-    async def process_message(self, message: discord.Message, config: dict):
-        upvotes = await self.count_reactions(message, config['icons'][0])
-        log.debug(f'upvotes: {upvotes}')
-        downvotes = await self.count_reactions(message, config['icons'][1])
-        log.debug(f'downvotes: {downvotes}')
+            message = await self.get_message(channel, payload.message_id)
+        self.tallies.pop(message.id, None)
+        await self.process_message(message, config, tally)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
+        """Decrement the tally for reactions removed from tracked messages"""
+        tally = self.tallies.get(payload.message_id)
+        if tally is None or not payload.guild_id:
+            return
+        guild: discord.Guild = self.bot.get_guild(payload.guild_id)
+        if not guild or self.is_bot(guild, payload.user_id):
+            return
+        config: dict = await self.get_settings(guild)
+        if str(payload.emoji) not in config['icons']:
+            return
+        i = config['icons'].index(str(payload.emoji))
+        tally[i] = max(tally[i] - 1, 0)
+        log.debug('tally: %s', tally)
+
+    async def process_message(self, message: discord.Message, config: dict,
+                              tally: List[int]):
+        upvotes, downvotes = tally
         log.debug(f'Total DOWN: {downvotes-upvotes}')
         log.debug(f'Total UP: {upvotes-downvotes}')
         log.debug(f"config.votes: {config['votes']}")
@@ -110,6 +171,7 @@ class ReactVote(commands.Cog):
         last: list = config['last'][50:]
         last.append(message.id)
         await self.config.guild(message.guild).last.set(last)
+        config['last'] = last
 
     @staticmethod
     def get_message_content(message, text) -> str:
@@ -129,6 +191,11 @@ class ReactVote(commands.Cog):
                             count -= 1
         return count
 
+    async def get_message(self, channel: discord.TextChannel, message_id: int) -> discord.Message:
+        """Get a Message from the bot cache, its reactions are kept current, or fetch it"""
+        message = discord.utils.get(self.bot.cached_messages, id=message_id)
+        return message or await channel.fetch_message(message_id)
+
     @staticmethod
     async def repost_message(message: discord.Message, destination: discord.TextChannel,
                              content: str, delete=True, silent=True) -> discord.Message:
@@ -157,8 +224,10 @@ class ReactVote(commands.Cog):
         enabled = await self.config.guild(ctx.guild).enabled()
         if enabled:
             await self.config.guild(ctx.guild).enabled.set(False)
+            await self.refresh_settings(ctx.guild)
             return await ctx.send(f'\U0001F6D1 {self.__cog_name__} Disabled.')
         await self.config.guild(ctx.guild).enabled.set(True)
+        await self.refresh_settings(ctx.guild)
         await ctx.send(f'\U00002705 {self.__cog_name__} Enabled.')
 
     @_reactvote.command(name='channels')
@@ -236,7 +305,7 @@ class ReactVote(commands.Cog):
         await ctx.send(out)
 
     async def sync_settings(self, guild: discord.Guild):
-        config = await self.config.guild(guild).all()
+        config = await self.refresh_settings(guild)
         if config['upvote']:
             channel: discord.TextChannel = guild.get_channel(config['upvote'])
             topic = f"Messages w/ +{config['votes']} {config['icons'][0]} will be reposted here."
@@ -285,10 +354,12 @@ class ChannelView(discord.ui.View):
             channels.append(value)
         if not channels:
             await self.cog.config.guild(interaction.guild).channels.set([])
+            await self.cog.refresh_settings(interaction.guild)
             msg = '\U00002705 ReactVote Channels Cleared.'
             return await response.send_message(msg, ephemeral=True, delete_after=self.delete_after)
         ids = [x.id for x in channels]
         await self.cog.config.guild(interaction.guild).channels.set(ids)
+        await self.cog.refresh_settings(interaction.guild)
         names = [x.name for x in channels]
         msg = f'\U00002705 ReactVote Channels Set to: {cf.humanize_list(names)}'
         return await response.send_message(msg, ephemeral=True, delete_after=self.delete_after)
@@ -4,12 +4,14 @@ import geopy
 import httpx
 import logging
 import pytz
-from geopy.geocoders import Nominatim
+import redis.asyncio as redis
 from timezonefinder import TimezoneFinder
 from typing import Any, Dict, Optional, Tuple, Union
 
 from redbot.core import app_commands, commands
 
+from .geocode import Geocoder
+
 log = logging.getLogger('red.sunsetrise')
 
 
@@ -21,11 +23,21 @@ class Sunsetrise(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self.gl = Nominatim(user_agent=self.__cog_name__)
+        self.redis: Optional[redis.Redis] = None
+        self.geo: Optional[Geocoder] = None
         self.tf = TimezoneFinder()
 
     async def cog_load(self):
         log.info('%s: Cog Load Start', self.__cog_name__)
+        redis_data: dict = await self.bot.get_shared_api_tokens('redis')
+        self.redis = redis.Redis(
+            host=redis_data.get('host', 'redis'),
+            port=int(redis_data.get('port', 6379)),
+            db=int(redis_data.get('db', 0)),
+            password=redis_data.get('pass', None),
+        )
+        await self.redis.ping()
+        self.geo = Geocoder(self.redis, self.__cog_name__)
         log.info('%s: Cog Load Finish', self.__cog_name__)
 
     async def cog_unload(self):
@@ -37,7 +49,7 @@ class Sunsetrise(commands.Cog):
     @app_commands.describe(location='Location to get SUn Data for')
     async def sun_command(self, ctx: commands.Context, *, location: str):
         """Get Sun Data for <location>"""
-        geo = self.gl.geocode(location)
+        geo = await self.geo.geocode(location)
         if not geo or not geo.latitude or not geo.longitude:
             return await ctx.send(f'⛔  Error getting Lat/Lon Data for: {location}')
 
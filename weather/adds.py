@@ -0,0 +1,125 @@
+import datetime
+import httpx
+import json
+import logging
+import redis.asyncio as redis
+import xmltodict
+from typing import Dict, Iterable, List
+
+log = logging.getLogger('red.weather')
+
+
+class ADDS(object):
+    """
+    Aviation Weather METAR/TAF client with per station Redis caching
+
+    :param redis_client: Redis client
+    """
+    url = 'https://www.aviationweather.gov/adds/dataserver_current/httpparam'
+    http_options = {
+        'follow_redirects': True,
+        'timeout': 10,
+        'headers': {'user-agent': 'CarlBot'},
+    }
+    min_ttl = 60
+    not_found_ttl = 60*5
+    # routine METARs are hourly, TAFs every 6 hours, both often amended
+    intervals = {'metars': 60*60, 'tafs': 60*60*6}
+    max_ttl = {'metars': 60*60, 'tafs': 60*60}
+    time_keys = {'metars': 'observation_time', 'tafs': 'issue_time'}
+    grace = 60*5
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+        self.client = httpx.AsyncClient(**self.http_options)
+
+    def __repr__(self):
+        return f'ADDS(url={self.url!r})'
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    @staticmethod
+    def split_stations(stations: Iterable[str]) -> List[str]:
+        results = []
+        for station in stations:
+            for s in station.upper().replace(',', ' ').split():
+                if s not in results:
+                    results.append(s)
+        return results
+
+    async def metars(self, stations: Iterable[str], hours: int = 1) -> Dict[str, List[dict]]:
+        """
+        :param stations: Station IDs
+        :param hours: Hours of METARs per station
+        :return: Dictionary of station: [metar] newest first, empty list if none
+        """
+        return await self._get('metars', self.split_stations(stations), hours)
+
+    async def tafs(self, stations: Iterable[str]) -> Dict[str, List[dict]]:
+        """
+        :param stations: Station IDs
+        :return: Dictionary of station: [taf] with the most recent TAF only
+        """
+        return await self._get('tafs', self.split_stations(stations), 0)
+
+    async def _get(self, source: str, stations: List[str], hours: int) -> Dict[str, List[dict]]:
+        results: Dict[str, List[dict]] = {}
+        keys = [f'adds:{source}:{hours}:{s}' for s in stations]
+        cached = await self.redis.mget(keys) if keys else []
+        missing = []
+        for station, value in zip(stations, cached):
+            if value is None:
+                missing.append(station)
+            else:
+                results[station] = json.loads(value)
+        log.debug('%s cached: %s missing: %s', source, list(results), missing)
+        if not missing:
+            return results
+
+        fetched = await self._fetch(source, missing, hours)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for station in missing:
+                data = fetched.get(station, [])
+                ttl = self.get_ttl(source, data)
+                pipe.setex(f'adds:{source}:{hours}:{station}', ttl, json.dumps(data))
+                results[station] = data
+            await pipe.execute()
+        return results
+
+    async def _fetch(self, source: str, stations: List[str], hours: int) -> Dict[str, List[dict]]:
+        params = {
+            'dataSource': source,
+            'requestType': 'retrieve',
+            'format': 'xml',
+            'stationString': ','.join(stations),
+        }
+        if source == 'tafs':
+            params.update({'hoursBeforeNow': 6, 'mostRecentForEachStation': 'true'})
+        else:
+            params['hoursBeforeNow'] = hours
+        r = await self.client.get(self.url, params=params)
+        r.raise_for_status()
+        log.debug('r.url: %s', r.url)
+        tag = source[:-1].upper()
+        data = xmltodict.parse(r.content, force_list=(tag,))['response']['data']
+        grouped: Dict[str, List[dict]] = {}
+        for item in (data or {}).get(tag, []):
+            grouped.setdefault(item['station_id'], []).append(item)
+        time_key = self.time_keys[source]
+        for items in grouped.values():
+            items.sort(key=lambda x: x.get(time_key, ''), reverse=True)
+        return grouped
+
+    def get_ttl(self, source: str, data: List[dict]) -> int:
+        """Seconds until the next expected report for a station."""
+        if not data:
+            return self.not_found_ttl
+        try:
+            latest = datetime.datetime.fromisoformat(
+                data[0][self.time_keys[source]].replace('Z', '+00:00'))
+        except (KeyError, ValueError):
+            return self.min_ttl
+        expected = latest + datetime.timedelta(seconds=self.intervals[source] + self.grace)
+        remaining = (expected - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+        return int(min(max(remaining, self.min_ttl), self.max_ttl[source]))
@@ -0,0 +1,154 @@
+import datetime
+import io
+from PIL import Image, ImageDraw, ImageFont
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class HourlyChart(object):
+    """
+    Render an hourly forecast chart from NWS forecastHourly periods with Pillow
+
+    :param periods: List of forecastHourly periods
+    :param title: Chart title
+    :param hours: Number of hours to plot
+    """
+    width, height = 1200, 560
+    left, top, right, bottom = 70, 80, 70, 110
+    colors = {
+        'background': (32, 34, 37),
+        'grid': (64, 68, 75),
+        'text': (220, 221, 222),
+        'muted': (142, 146, 151),
+        'temp': (237, 66, 69),
+        'dew': (87, 242, 135),
+        'pop': (52, 101, 164),
+        'day': (114, 137, 218),
+    }
+    font_names = ['DejaVuSans.ttf', 'Arial.ttf', 'LiberationSans-Regular.ttf']
+
+    def __init__(self, periods: List[Dict[str, Any]], title: str, hours: int = 48):
+        self.periods = periods[:hours]
+        self.title = title
+        self.font = self.load_font(14)
+        self.font_title = self.load_font(20)
+
+    def __repr__(self):
+        return f'HourlyChart(title={self.title!r}, hours={len(self.periods)})'
+
+    @classmethod
+    def load_font(cls, size: int) -> ImageFont.ImageFont:
+        for name in cls.font_names:
+            try:
+                return ImageFont.truetype(name, size)
+            except OSError:
+                continue
+        return ImageFont.load_default()
+
+    @staticmethod
+    def to_f(value: Optional[float], unit: str = 'C') -> Optional[float]:
+        if value is None:
+            return None
+        return value * 9/5 + 32 if unit.upper().endswith('C') else value
+
+    @staticmethod
+    def parse_wind(speed: str) -> int:
+        # "10 mph" or "10 to 15 mph"
+        numbers = [int(x) for x in speed.split() if x.isdigit()]
+        return max(numbers) if numbers else 0
+
+    def parse(self) -> List[Dict[str, Any]]:
+        rows = []
+        for p in self.periods:
+            rows.append({
+                'time': datetime.datetime.fromisoformat(p['startTime']),
+                'temp': self.to_f(p['temperature'], p.get('temperatureUnit', 'F')),
+                'dew': self.to_f((p.get('dewpoint') or {}).get('value')),
+                'pop': (p.get('probabilityOfPrecipitation') or {}).get('value') or 0,
+                'wind': self.parse_wind(p.get('windSpeed') or ''),
+                'wind_dir': p.get('windDirection') or '',
+            })
+        return rows
+
+    def render(self) -> bytes:
+        """
+        :return: PNG image bytes
+        """
+        rows = self.parse()
+        image = Image.new('RGB', (self.width, self.height), self.colors['background'])
+        draw = ImageDraw.Draw(image)
+        draw.text((self.left, 20), self.title, fill=self.colors['text'], font=self.font_title)
+        if not rows:
+            return self.save(image)
+
+        x0, y0 = self.left, self.top
+        x1, y1 = self.width - self.right, self.height - self.bottom
+        step = (x1 - x0) / len(rows)
+
+        values = [r['temp'] for r in rows] + [r['dew'] for r in rows if r['dew'] is not None]
+        low = int(min(values) // 10 * 10)
+        high = int(-(-max(values) // 10) * 10)
+        if high == low:
+            high += 10
+
+        def temp_y(value: float) -> float:
+            return y1 - (value - low) / (high - low) * (y1 - y0)
+
+        def pop_y(value: float) -> float:
+            return y1 - value / 100 * (y1 - y0)
+
+        def hour_x(i: int) -> float:
+            return x0 + step * i + step / 2
+
+        # precipitation bars first so lines draw over them
+        for i, row in enumerate(rows):
+            if row['pop']:
+                draw.rectangle((x0 + step * i + 1, pop_y(row['pop']), x0 + step * (i + 1) - 1, y1),
+                               fill=self.colors['pop'])
+
+        for value in range(low, high + 1, 10):
+            y = temp_y(value)
+            draw.line((x0, y, x1, y), fill=self.colors['grid'])
+            self.text(draw, (x0 - 8, y), f'{value}°', 'rm', self.colors['temp'])
+        for value in (0, 50, 100):
+            self.text(draw, (x1 + 8, pop_y(value)), f'{value}%', 'lm', self.colors['pop'])
+
+        for i, row in enumerate(rows):
+            x = hour_x(i)
+            hour = row['time'].hour
+            if hour == 0 or i == 0:
+                draw.line((x0 + step * i, y0, x0 + step * i, y1), fill=self.colors['day'])
+                self.text(draw, (x0 + step * i + 4, y0 - 4), row['time'].strftime('%a %m/%d'),
+                          'ld', self.colors['day'])
+            if i % 3 == 0:
+                label = row['time'].strftime('%I%p').lstrip('0').lower()[:-1]
+                self.text(draw, (x, y1 + 14), label, 'mm', self.colors['muted'])
+                self.text(draw, (x, y1 + 36), f"{row['wind']}", 'mm', self.colors['text'])
+                self.text(draw, (x, y1 + 54), row['wind_dir'], 'mm', self.colors['muted'])
+
+        for key in ('dew', 'temp'):
+            points = [(hour_x(i), temp_y(r[key])) for i, r in enumerate(rows) if r[key] is not None]
+            if len(points) > 1:
+                draw.line(points, fill=self.colors[key], width=3, joint='curve')
+
+        legend = [('Temperature °F', 'temp'), ('Dew Point °F', 'dew'),
+                  ('Precip Chance', 'pop'), ('Wind mph', 'text')]
+        x = x0
+        for label, color in legend:
+            draw.rectangle((x, y1 + 76, x + 14, y1 + 90), fill=self.colors[color])
+            self.text(draw, (x + 20, y1 + 83), label, 'lm', self.colors['text'])
+            x += 180
+        return self.save(image)
+
+    def text(self, draw: ImageDraw.ImageDraw, xy: Tuple[float, float], text: str,
+             anchor: str, fill: Tuple[int, int, int]) -> None:
+        try:
+            draw.text(xy, text, fill=fill, font=self.font, anchor=anchor)
+        except ValueError:
+            # anchors are only supported with truetype fonts
+            draw.text(xy, text, fill=fill, font=self.font)
+
+    @staticmethod
+    def save(image: Image.Image) -> bytes:
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        return buffer.getvalue()
@@ -0,0 +1,111 @@
+import asyncio
+import datetime
+import httpx
+import json
+import logging
+import redis.asyncio as redis
+from typing import Any, Dict, Tuple
+
+log = logging.getLogger('red.weather')
+
+
+class NWS(object):
+    """
+    api.weather.gov client with Redis caching
+
+    :param redis_client: Redis client
+    """
+    base_url = 'https://api.weather.gov'
+    http_options = {
+        'follow_redirects': True,
+        'timeout': 10,
+        'headers': {'user-agent': 'CarlBot', 'accept': 'application/geo+json'},
+    }
+    meta_ttl = 60*60*24*7
+    forecast_ttl = 60*15
+    observation_ttl = 60*5
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+        self.client = httpx.AsyncClient(**self.http_options)
+
+    def __repr__(self):
+        return f'NWS(base_url={self.base_url!r})'
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    async def _get_json(self, url: str) -> Dict[str, Any]:
+        log.debug('url: %s', url)
+        r = await self.client.get(url)
+        r.raise_for_status()
+        return r.json()
+
+    async def _cached_json(self, key: str, url: str, ttl: int) -> Dict[str, Any]:
+        cached = await self.redis.get(key)
+        if cached:
+            return json.loads(cached)
+        data = await self._get_json(url)
+        await self.redis.setex(key, ttl, json.dumps(data))
+        return data
+
+    @staticmethod
+    def round_point(lat: float, lon: float) -> Tuple[float, float]:
+        # ~100m, well inside a 2.5km forecast grid cell
+        return round(lat, 3), round(lon, 3)
+
+    async def metadata(self, lat: float, lon: float) -> Dict[str, Any]:
+        """
+        :return: Grid, forecast URLs and nearest observation station for a point
+        """
+        lat, lon = self.round_point(lat, lon)
+        key = f'nws:meta:{lat},{lon}'
+        cached = await self.redis.get(key)
+        if cached:
+            return json.loads(cached)
+        points = (await self._get_json(f'{self.base_url}/points/{lat},{lon}'))['properties']
+        stations = await self._get_json(points['observationStations'])
+        meta = {
+            'gridId': points['gridId'],
+            'gridX': points['gridX'],
+            'gridY': points['gridY'],
+            'forecast': points['forecast'],
+            'forecastHourly': points['forecastHourly'],
+            'timeZone': points.get('timeZone'),
+            'station': stations['features'][0]['id'] if stations['features'] else None,
+        }
+        await self.redis.setex(key, self.meta_ttl, json.dumps(meta))
+        return meta
+
+    async def forecast(self, url: str) -> Dict[str, Any]:
+        return await self._cached_json(f'nws:forecast:{url}', url, self.forecast_ttl)
+
+    async def hourly(self, url: str) -> Dict[str, Any]:
+        return await self._cached_json(f'nws:hourly:{url}', url, self.forecast_ttl)
+
+    @staticmethod
+    def ttl_until_update(properties: Dict[str, Any], interval: int = 60*60,
+                         minimum: int = 60*5) -> int:
+        """Seconds until the next expected forecast update, from updateTime."""
+        try:
+            updated = datetime.datetime.fromisoformat(properties['updateTime'])
+        except (KeyError, TypeError, ValueError):
+            return minimum
+        now = datetime.datetime.now(datetime.timezone.utc)
+        remaining = interval - (now - updated).total_seconds()
+        return int(min(max(remaining, minimum), interval))
+
+    async def observation(self, station: str) -> Dict[str, Any]:
+        url = f'{station}/observations/latest'
+        return await self._cached_json(f'nws:obs:{station}', url, self.observation_ttl)
+
+    async def weather(self, lat: float, lon: float) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        :return: Tuple of latest observation and forecast
+        """
+        meta = await self.metadata(lat, lon)
+        observation, forecast = await asyncio.gather(
+            self.observation(meta['station']),
+            self.forecast(meta['forecast']),
+        )
+        return observation, forecast
@@ -1,20 +1,23 @@
+import asyncio
 import datetime
 import discord
 import geopy
 import httpx
 import io
 import logging
-import urllib.parse
-import xmltodict
-from geopy.geocoders import Nominatim
+import redis.asyncio as redis
 from metar import Metar
-from playwright.async_api import async_playwright
 from timezonefinder import TimezoneFinder
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 from redbot.core import app_commands, commands
 from redbot.core.utils import chat_formatting as cf
 
+from .adds import ADDS
+from .chart import HourlyChart
+from .geocode import Geocoder
+from .nws import NWS
+
 log = logging.getLogger('red.weather')
 
 
@@ -38,15 +41,33 @@ class Weather(commands.Cog):
         self.bot = bot
         # self.config = Config.get_conf(self, 1337, True)
         # self.config.register_user(**self.user_default)
-        self.gl = Nominatim(user_agent=self.__cog_name__)
+        self.redis: Optional[redis.Redis] = None
+        self.geo: Optional[Geocoder] = None
+        self.nws: Optional[NWS] = None
+        self.adds: Optional[ADDS] = None
         self.tf = TimezoneFinder()
 
     async def cog_load(self):
         log.info('%s: Cog Load Start', self.__cog_name__)
+        redis_data: dict = await self.bot.get_shared_api_tokens('redis')
+        self.redis = redis.Redis(
+            host=redis_data.get('host', 'redis'),
+            port=int(redis_data.get('port', 6379)),
+            db=int(redis_data.get('db', 0)),
+            password=redis_data.get('pass', None),
+        )
+        await self.redis.ping()
+        self.geo = Geocoder(self.redis, self.__cog_name__)
+        self.nws = NWS(self.redis)
+        self.adds = ADDS(self.redis)
         log.info('%s: Cog Load Finish', self.__cog_name__)
 
     async def cog_unload(self):
         log.info('%s: Cog Unload', self.__cog_name__)
+        if self.nws:
+            await self.nws.close()
+        if self.adds:
+            await self.adds.close()
 
     @commands.hybrid_command(name='weather', aliases=['noaa'], description='Get Weather for <location>')
     @commands.guild_only()
@@ -56,7 +77,7 @@ class Weather(commands.Cog):
         location = location.strip('` ')
         async with ctx.typing():
             try:
-                geo = self.gl.geocode(location)
+                geo = await self.geo.geocode(location)
                 if not geo or not geo.latitude or not geo.longitude:
                     content = f'⛔ Error getting Lat/Lon Data for: {location}'
                     return await ctx.send(content, delete_after=30)
@@ -171,19 +192,7 @@ class Weather(commands.Cog):
         return embed
 
     async def get_weather(self, lat: float, lon: float) -> Tuple[dict, dict]:
-        location_url = f'https://api.weather.gov/points/{lat},{lon}'
-        location_data: Dict[str, Any] = await self._get_json(location_url)
-
-        forecast_url: str = location_data["properties"]["forecast"]
-        forecast: Dict[str, Any] = await self._get_json(forecast_url)
-
-        stations_url: str = location_data["properties"]["observationStations"]
-        stations: Dict[str, Any] = await self._get_json(stations_url)
-
-        observation_url: str = stations["features"][0]["id"] + '/observations/latest'
-        observation: Dict[str, Any] = await self._get_json(observation_url)
-
-        return observation, forecast
+        return await self.nws.weather(lat, lon)
 
     @commands.hybrid_command(name='metar', aliases=['metars'], description='Decode <metar>')
     @commands.guild_only()
@@ -200,52 +209,66 @@ class Weather(commands.Cog):
             log.error(error)
             await ctx.send(f'⛔ Error: {error}', delete_after=30)
 
-    @commands.hybrid_command(name='getmetar', aliases=['getmetars'], description='Get METAR for <location>')
+    @commands.hybrid_command(name='getmetar', aliases=['getmetars'], description='Get METAR for <stations>')
     @commands.guild_only()
-    @app_commands.describe(station='Station to get METAR for', hours='Hours of METARS to fetch')
-    async def getmetar_command(self, ctx: commands.Context, station: str, hours: Optional[int] = 1):
-        """Get METAR for <station>"""
+    @app_commands.describe(station='Station(s) to get METAR for, comma separated, optional trailing hours')
+    async def getmetar_command(self, ctx: commands.Context, *, station: str):
+        """Get METAR for <station>, or multiple stations, followed by optional [hours]"""
         await ctx.typing()
-        station = station.upper().strip('` ')
-        log.debug('station: %s', station)
+        stations = self.adds.split_stations([station.strip('` ')])
+        hours = int(stations.pop()) if stations and stations[-1].isdigit() else 1
+        log.debug('stations: %s', stations)
         log.debug('hours: %s', hours)
         if hours < 1:
             return await ctx.send('⛔ Hours must be 1 or greater.', delete_after=30)
+        if not stations:
+            return await ctx.send('⛔ No Stations provided.', delete_after=30)
 
-        metars = await self.get_metar(station, hours)
+        results: Dict[str, List[dict]] = await self.adds.metars(stations, hours)
+        metars = [x for s in stations for x in results.get(s, [])]
         if not metars:
-            return await ctx.send(f'⛔ No Results for: {station}', delete_after=30)
+            return await ctx.send(f"⛔ No Results for: {', '.join(stations)}", delete_after=30)
 
-        url = self.metar.format(loc=station, hours=hours)
+        loc = ','.join(stations)
+        url = self.metar.format(loc=loc, hours=hours)
         if len(metars) == 1:
             obs = Metar.Metar(metars[0]['raw_text'])
             content = f'METAR for **{obs.station_id}** at `{obs.time}`\n<{url}>\n{obs.string()}'
             return await ctx.send(content)
 
         metas = [x['raw_text'] for x in metars]
-        plain = cf.box('\n'.join(metas))
+        missing = [s for s in stations if not results.get(s)]
+        if missing:
+            metas.append(f"No Results: {', '.join(missing)}")
         log.debug('metas: %s', metas)
-        content = f'METARS `{len(metars)}` for **{station}** over `{hours}` hours:\n<{url}>\n{plain}'
-        await ctx.send(content)
-
-    async def get_metar(self, location: str, hours: Optional[int] = 1) -> Optional[List[dict]]:
-        url = 'https://www.aviationweather.gov/adds/dataserver_current/httpparam'
-        params = {
-            'dataSource': 'metars',
-            'requestType': 'retrieve',
-            'format': 'xml',
-            'stationString': location,
-            'hoursBeforeNow': hours,
-        }
-        r = await self._get_json(url, json=False, **params)
-        log.debug('r.url: %s', r.url)
-        data = xmltodict.parse(r.text)['response']['data']
-        if int(data['@num_results']) < 1:
-            return
-        elif int(data['@num_results']) == 1:
-            return [data['METAR']]
-        else:
-            return data['METAR']
+        header = f'METARS `{len(metars)}` for **{loc}** over `{hours}` hours:\n<{url}>\n'
+        await self.send_boxed(ctx, header, metas)
+
+    @commands.hybrid_command(name='gettaf', aliases=['gettafs', 'taf'], description='Get TAF for <stations>')
+    @commands.guild_only()
+    @app_commands.describe(station='Station(s) to get TAF for, comma separated')
+    async def gettaf_command(self, ctx: commands.Context, *, station: str):
+        """Get TAF for <station>, or multiple comma separated stations"""
+        await ctx.typing()
+        stations = self.adds.split_stations([station.strip('` ')])
+        log.debug('stations: %s', stations)
+        if not stations:
+            return await ctx.send('⛔ No Stations provided.', delete_after=30)
+
+        results: Dict[str, List[dict]] = await self.adds.tafs(stations)
+        tafs = [x['raw_text'] for s in stations for x in results.get(s, [])]
+        if not tafs:
+            return await ctx.send(f"⛔ No Results for: {', '.join(stations)}", delete_after=30)
+        missing = [s for s in stations if not results.get(s)]
+        if missing:
+            tafs.append(f"No Results: {', '.join(missing)}")
+        await self.send_boxed(ctx, f"TAF for **{', '.join(stations)}**:\n", tafs)
+
+    @staticmethod
+    async def send_boxed(ctx: commands.Context, header: str, lines: List[str]) -> None:
+        pages = cf.pagify('\n'.join(lines), delims=['\n'], page_length=1900 - len(header))
+        for i, page in enumerate(pages):
+            await ctx.send((header if i == 0 else '') + cf.box(page))
 
     @commands.hybrid_command(name='hourly', description='Hourly Forecast for <location>')
     @commands.guild_only()
@@ -254,9 +277,7 @@ class Weather(commands.Cog):
         """Get Hourly Forecast for <location>"""
         await ctx.typing()
         location = location.strip('` ')
-        geo = self.gl.geocode(location)
-        log.debug('lat: %s', geo.latitude)
-        log.debug('lon: %s', geo.longitude)
+        geo = await self.geo.geocode(location)
         if not geo or not geo.latitude or not geo.longitude:
             content = f'⛔ Error getting Lat/Lon Data for: {location}'
             return await ctx.send(content, delete_after=30)
@@ -267,41 +288,20 @@ class Weather(commands.Cog):
         file = discord.File(bytesio, self.get_ts() + '.png')
         await ctx.send(f'Hourly forecast for **{location}**', file=file)
 
-    @staticmethod
-    async def get_hourly(lat: str, lon: str) -> bytes:
-        log.debug('lat: %s', lat)
-        log.debug('lon: %s', lon)
-        async with async_playwright() as p:
-            params = {
-                'w0':	't',
-                'w1':	'td',
-                'w2':	'hi',
-                'w3':	'sfcwind',
-                'w4':	'sky',
-                'w5':	'pop',
-                'w6':	'rh',
-                'w7':	'rain',
-                'AheadHour':	'0',
-                'Submit':	'Submit',
-                'FcstType':	'graphical',
-                'textField1':	lat,
-                'textField2':	lon,
-                'site':	'all',
-                'menu':	'1',
-            }
-            query = urllib.parse.urlencode(params)
-            url = f'https://forecast.weather.gov/MapClick.php?{query}'
-            log.debug('url: %s', url)
-            browser = await p.chromium.launch()
-            page = await browser.new_page()
-            await page.goto(url=url, timeout=60000)
-            table = page.locator("table").nth(5)
-            if not table:
-                log.debug('11111 NO TABLE')
-            shot = await table.screenshot()
-            if not shot:
-                log.debug('11111 NO SHOT')
-            return shot
+    async def get_hourly(self, lat: float, lon: float) -> bytes:
+        meta: Dict[str, Any] = await self.nws.metadata(lat, lon)
+        key = f"nws:chart:{meta['gridId']}:{meta['gridX']},{meta['gridY']}"
+        cached: Optional[bytes] = await self.redis.get(key)
+        if cached:
+            return cached
+        hourly: Dict[str, Any] = await self.nws.hourly(meta['forecastHourly'])
+        properties = hourly['properties']
+        title = f"Hourly Forecast - {meta['gridId']} {meta['gridX']},{meta['gridY']}"
+        chart = HourlyChart(properties['periods'], title)
+        loop = asyncio.get_running_loop()
+        shot: bytes = await loop.run_in_executor(None, chart.render)
+        await self.redis.setex(key, self.nws.ttl_until_update(properties), shot)
+        return shot
 
     @staticmethod
     def get_ts(stamp: Optional[str] = '%Y%m%d-%H%M%S',
@@ -0,0 +1,112 @@
+import asyncio
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+import dns.reversename
+import ipaddress
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+log = logging.getLogger('red.webtools')
+
+
+class DNSResolver(object):
+    """
+    Async DNS resolver with a TTL respecting LRU cache
+
+    :param max_entries: Maximum number of cached answers
+    :param lifetime: Seconds before a query is abandoned
+    """
+    rdtypes = ('A', 'AAAA', 'CNAME', 'MX', 'NS', 'PTR', 'SOA', 'SRV', 'TXT')
+    negative_ttl = 60
+    max_ttl = 60*60
+
+    def __init__(self, max_entries: int = 1024, lifetime: float = 5.0):
+        self.max_entries = max_entries
+        self.resolver = dns.asyncresolver.Resolver()
+        self.resolver.lifetime = lifetime
+        self.cache: 'OrderedDict[Tuple[str, str], Tuple[float, List[str]]]' = OrderedDict()
+        self.inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def __repr__(self):
+        return f'DNSResolver(cached={len(self.cache)})'
+
+    @staticmethod
+    def is_ip(value: str) -> bool:
+        try:
+            ipaddress.ip_address(value)
+            return True
+        except ValueError:
+            return False
+
+    async def resolve(self, name: str, rdtype: str = 'A') -> List[str]:
+        """
+        :param name: Hostname, or IP Address for PTR
+        :param rdtype: Record type, one of DNSResolver.rdtypes
+        :return: List of record strings, empty if none exist
+        :raises dns.exception.DNSException: on timeouts and server failures
+        """
+        rdtype = rdtype.upper()
+        if rdtype not in self.rdtypes:
+            raise ValueError(f'Unsupported record type: {rdtype}')
+        if rdtype == 'PTR' and self.is_ip(name):
+            name = dns.reversename.from_address(name).to_text()
+        key = (name.lower().rstrip('.'), rdtype)
+        cached = self.cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            self.cache.move_to_end(key)
+            self.stats['hits'] += 1
+            return cached[1]
+        self.stats['misses'] += 1
+        task = self.inflight.get(key)
+        if not task:
+            task = asyncio.create_task(self._query(key))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _query(self, key: Tuple[str, str]) -> List[str]:
+        name, rdtype = key
+        try:
+            answer = await self.resolver.resolve(name, rdtype)
+            records = [self.format_rdata(rdtype, r) for r in answer]
+            ttl = min(answer.rrset.ttl, self.max_ttl)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            records, ttl = [], self.negative_ttl
+        log.debug('DNSResolver: %s %s ttl=%s %s', name, rdtype, ttl, records)
+        self.cache[key] = (time.monotonic() + ttl, records)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+        return records
+
+    @staticmethod
+    def format_rdata(rdtype: str, rdata) -> str:
+        if rdtype == 'TXT':
+            return b''.join(rdata.strings).decode(errors='replace')
+        if rdtype == 'MX':
+            return f'{rdata.preference} {rdata.exchange.to_text().rstrip(".")}'
+        if rdtype in ('CNAME', 'NS', 'PTR'):
+            return rdata.target.to_text().rstrip('.')
+        return rdata.to_text()
+
+    async def lookup(self, name: str, rdtypes: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        :param name: Hostname or IP Address
+        :param rdtypes: Record types to query concurrently
+        :return: Dictionary of rdtype: records or error string list
+        """
+        rdtypes = list(rdtypes)
+        results = await asyncio.gather(*[self.resolve(name, t) for t in rdtypes],
+                                       return_exceptions=True)
+        output = {}
+        for rdtype, result in zip(rdtypes, results):
+            if isinstance(result, Exception):
+                log.debug('DNSResolver: %s %s error: %s', name, rdtype, result)
+                output[rdtype] = [f'Error: {result.__class__.__name__}']
+            else:
+                output[rdtype] = result
+        return output
@@ -1,3 +1,4 @@
+import asyncio
 import discord
 import fuckit
 import httpx
@@ -7,7 +8,6 @@ import os
 import pathlib
 import re
 import shutil
-import socket
 import sys
 import whois
 from io import BytesIO, StringIO
@@ -18,6 +18,7 @@ from redbot.core import commands
 from redbot.core.utils import chat_formatting as cf
 
 from .functions import verbose_ping
+from .resolver import DNSResolver
 
 log = logging.getLogger('red.webtools')
 
@@ -49,6 +50,7 @@ class Webtools(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.cog_dir = pathlib.Path(__file__).parent.resolve()
+        self.resolver = DNSResolver()
 
     async def cog_load(self):
         log.info('%s: Cog Load Start', self.__cog_name__)
@@ -110,21 +112,40 @@ class Webtools(commands.Cog):
         await ctx.send(content)
 
     @commands.command(name='host', aliases=['nslookup'])
-    async def host_command(self, ctx: commands.Context, hostname: str):
+    async def host_command(self, ctx: commands.Context, *hostnames: str):
+        """
+        Lookup DNS for one or more <hostnames> with optional record types.
+        Example:
+            [p]host google.com
+            [p]host google.com github.com mx txt
+            [p]host 8.8.8.8 1.1.1.1
+        """
+        hosts, rdtypes = [], []
+        for arg in hostnames:
+            arg = arg.strip('`*,')
+            if arg.upper() in DNSResolver.rdtypes:
+                rdtypes.append(arg.upper())
+            elif arg and arg not in hosts:
+                hosts.append(arg)
+        if not hosts:
+            return await ctx.send_help()
         await ctx.typing()
-        hostname = hostname.strip('`*')
-        try:
-            if re.match(r'^([0-9]{1,3}\.){3}[0-9]{1,3}$', hostname):
-                result, _, _ = socket.gethostbyaddr(hostname)
-            else:
-                result = socket.gethostbyname(hostname)
-            if result:
-                await ctx.send(f'**{hostname}:** `{result}`')
-            else:
-                await ctx.send(f'⛔ No result for: `{hostname}:`')
-        except Exception as error:
-            log.error(error)
-            await ctx.send(f'⛔ Error: `{error}`')
+
+        def host_types(host: str) -> List[str]:
+            if rdtypes:
+                return rdtypes
+            return ['PTR'] if self.resolver.is_ip(host) else ['A', 'AAAA']
+
+        results = await asyncio.gather(*[self.resolver.lookup(h, host_types(h)) for h in hosts])
+        lines = []
+        for host, records in zip(hosts, results):
+            for rdtype, values in records.items():
+                if not values:
+                    lines.append(f'{host} {rdtype} -')
+                for value in values:
+                    lines.append(f'{host} {rdtype} {value}')
+        for page in cf.pagify('\n'.join(lines), delims=['\n'], page_length=1900):
+            await ctx.send(cf.box(page))
 
     @commands.command(name='ping')
     async def ping_command(self, ctx: commands.Context, hostname: str):
@@ -177,8 +198,11 @@ class Webtools(commands.Cog):
     async def ipinfo_command(self, ctx: commands.Context, ip_address: str):
         await ctx.typing()
         try:
-            if not re.match(r'^([0-9]{1,3}\.){3}[0-9]{1,3}$', ip_address):
-                ip_address, _, _ = socket.gethostbyaddr(ip_address)
+            if not self.resolver.is_ip(ip_address):
+                addresses = await self.resolver.resolve(ip_address, 'A')
+                if not addresses:
+                    return await ctx.send(f'⛔ No A record for: `{ip_address}`')
+                ip_address = addresses[0]
             ip = ipaddress.ip_address(ip_address)
             data = await self.get_ip_data(ip.compressed)
             log.debug('data: %s', data)
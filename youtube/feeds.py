@@ -0,0 +1,100 @@
+import asyncio
+import hashlib
+import httpx
+import logging
+import random
+import re
+import xmltodict
+from typing import Dict, Iterable, Optional
+
+log = logging.getLogger('red.youtube')
+
+
+class FeedPoller(object):
+    """
+    YouTube channel feed poller with conditional requests
+
+    :param concurrency: Maximum number of concurrent feed requests
+    :param jitter: Maximum random delay in seconds before each request
+    """
+    feed_url = 'https://www.youtube.com/feeds/videos.xml?channel_id={}'
+    http_options = {'follow_redirects': True, 'timeout': 10}
+    video_id_re = re.compile(rb'<yt:videoId>([^<]+)</yt:videoId>')
+
+    def __init__(self, concurrency: int = 16, jitter: float = 2.0):
+        self.concurrency = concurrency
+        self.jitter = jitter
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=concurrency),
+            **self.http_options,
+        )
+        self.validators: Dict[str, Dict[str, str]] = {}
+        self.stats = {'fetched': 0, 'not_modified': 0, 'unchanged': 0, 'errors': 0}
+
+    def __repr__(self):
+        return f'FeedPoller(feeds={len(self.validators)})'
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    def forget(self, channel_id: str) -> None:
+        self.validators.pop(channel_id, None)
+
+    async def fetch(self, channel_id: str, force: bool = False) -> Optional[Dict[str, dict]]:
+        """
+        :param channel_id: YouTube Channel ID
+        :param force: Ignore stored validators and always parse the feed
+        :return: Dictionary of video_id: entry, newest first, or None if unchanged
+        """
+        validators = {} if force else self.validators.get(channel_id, {})
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('modified'):
+            headers['If-Modified-Since'] = validators['modified']
+        r = await self.client.get(self.feed_url.format(channel_id), headers=headers)
+        if r.status_code == 304:
+            self.stats['not_modified'] += 1
+            return None
+        r.raise_for_status()
+        self.stats['fetched'] += 1
+        # view counts change on every request, so only hash the video ids
+        digest = hashlib.sha1(b'\n'.join(self.video_id_re.findall(r.content))).hexdigest()
+        unchanged = digest == validators.get('hash')
+        self.validators[channel_id] = {
+            'etag': r.headers.get('etag'),
+            'modified': r.headers.get('last-modified'),
+            'hash': digest,
+        }
+        if unchanged:
+            self.stats['unchanged'] += 1
+            return None
+        return self.parse_feed(r.content)
+
+    @staticmethod
+    def parse_feed(content: bytes) -> Dict[str, dict]:
+        feed = xmltodict.parse(content)
+        entries = feed['feed'].get('entry') or []
+        if isinstance(entries, dict):
+            entries = [entries]
+        return {entry['yt:videoId']: entry for entry in entries}
+
+    async def poll(self, channel_ids: Iterable[str]) -> Dict[str, Dict[str, dict]]:
+        """
+        :param channel_ids: YouTube Channel IDs to poll
+        :return: Dictionary of channel_id: {video_id: entry} for changed feeds only
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def poll_one(channel_id: str):
+            await asyncio.sleep(random.uniform(0, self.jitter))
+            async with semaphore:
+                try:
+                    return channel_id, await self.fetch(channel_id)
+                except Exception as error:
+                    self.stats['errors'] += 1
+                    log.warning('Error polling feed %s: %s', channel_id, error)
+                    return channel_id, None
+
+        results = await asyncio.gather(*[poll_one(x) for x in channel_ids])
+        return {channel_id: videos for channel_id, videos in results if videos}
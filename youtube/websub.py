@@ -0,0 +1,114 @@
+import hmac
+import httpx
+import logging
+import xmltodict
+from aiohttp import web
+from typing import Awaitable, Callable, Optional
+from urllib.parse import parse_qs, urlparse
+
+log = logging.getLogger('red.youtube')
+
+
+class WebSubReceiver(object):
+    """
+    WebSub (PubSubHubbub) callback receiver for YouTube channel feeds
+
+    :param callback_url: Public URL the hub will call, proxied to this server
+    :param on_verify: Called with (mode, channel_id, lease_seconds), returns True to accept
+    :param on_notify: Called with the parsed feed dictionary of a notification
+    :param host: Listen address
+    :param port: Listen port
+    :param secret: HMAC secret sent to the hub, notifications without a valid signature are dropped
+    """
+    hub_url = 'https://pubsubhubbub.appspot.com/subscribe'
+    topic_url = 'https://www.youtube.com/xml/feeds/videos.xml?channel_id={}'
+    http_options = {'follow_redirects': True, 'timeout': 10}
+    algorithms = ('sha1', 'sha256', 'sha384', 'sha512')
+
+    def __init__(self, callback_url: str,
+                 on_verify: Callable[[str, str, int], Awaitable[bool]],
+                 on_notify: Callable[[dict], Awaitable[None]],
+                 secret: str, host: str = '0.0.0.0', port: int = 8080):
+        if not secret:
+            raise ValueError('WebSub secret is required')
+        self.callback_url = callback_url
+        self.on_verify = on_verify
+        self.on_notify = on_notify
+        self.host = host
+        self.port = port
+        self.secret = secret
+        self.path = urlparse(callback_url).path or '/'
+        self.runner: Optional[web.AppRunner] = None
+
+    def __repr__(self):
+        return f'WebSubReceiver(callback_url={self.callback_url!r}, port={self.port})'
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get(self.path, self.handle_verify)
+        app.router.add_post(self.path, self.handle_notify)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        log.info('WebSub: Listening on %s:%s%s', self.host, self.port, self.path)
+
+    async def stop(self) -> None:
+        if self.runner:
+            await self.runner.cleanup()
+
+    @staticmethod
+    def get_channel_id(topic: str) -> Optional[str]:
+        return parse_qs(urlparse(topic).query).get('channel_id', [None])[0]
+
+    async def handle_verify(self, request: web.Request) -> web.Response:
+        mode = request.query.get('hub.mode')
+        topic = request.query.get('hub.topic', '')
+        challenge = request.query.get('hub.challenge')
+        lease = int(request.query.get('hub.lease_seconds') or 0)
+        channel_id = self.get_channel_id(topic)
+        log.debug('WebSub: verify %s %s lease=%s', mode, channel_id, lease)
+        if not challenge or not channel_id or mode not in ('subscribe', 'unsubscribe'):
+            return web.Response(status=404)
+        if not await self.on_verify(mode, channel_id, lease):
+            return web.Response(status=404)
+        return web.Response(text=challenge)
+
+    async def handle_notify(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        signature = request.headers.get('X-Hub-Signature', '')
+        algo, _, digest = signature.partition('=')
+        if algo not in self.algorithms:
+            log.warning('WebSub: Missing or invalid signature')
+            return web.Response(status=202)
+        expected = hmac.new(self.secret.encode(), body, algo).hexdigest()
+        if not hmac.compare_digest(expected, digest):
+            log.warning('WebSub: Signature mismatch, ignoring notification')
+            # hubs expect a 2xx even for rejected content
+            return web.Response(status=202)
+        try:
+            feed = xmltodict.parse(body)
+        except Exception as error:
+            log.warning('WebSub: Error parsing notification: %s', error)
+            return web.Response(status=202)
+        if feed.get('feed', {}).get('entry'):
+            await self.on_notify(feed)
+        return web.Response(status=202)
+
+    async def subscribe(self, channel_id: str, mode: str = 'subscribe') -> httpx.Response:
+        """
+        :param channel_id: YouTube Channel ID
+        :param mode: subscribe or unsubscribe
+        :return: Hub response, 202 when verification is pending
+        """
+        data = {
+            'hub.callback': self.callback_url,
+            'hub.topic': self.topic_url.format(channel_id),
+            'hub.verify': 'async',
+            'hub.mode': mode,
+            'hub.secret': self.secret,
+        }
+        async with httpx.AsyncClient(**self.http_options) as client:
+            r = await client.post(self.hub_url, data=data)
+            r.raise_for_status()
+        return r
@@ -1,18 +1,21 @@
 import asyncio
+import datetime
 import discord
 import httpx
-# import json
 import logging
-import xmltodict
-# import redis.asyncio as redis
+import re
+import time
 from bs4 import BeautifulSoup
-from typing import Optional, Union, Dict
+from typing import Dict, List, Optional, Set, Union
 
 from discord.ext import tasks
 from redbot.core import app_commands, commands, Config
 from redbot.core.utils import AsyncIter
 from redbot.core.utils import chat_formatting as cf
 
+from .feeds import FeedPoller
+from .websub import WebSubReceiver
+
 log = logging.getLogger('red.youtube')
 
 
@@ -24,75 +27,161 @@ class YouTube(commands.Cog):
     global_default = {
         'channels': [],
         'videos': {},
+        'subscribers': {},
+        'leases': {},
     }
     channel_default = {
         'channels': {},
     }
 
-    channel = 'red.youtube'
+    poll_minutes = 30.0
+    fallback_minutes = 360.0
+    lease_renew = 60 * 60 * 12
+    seen_max = 30
+    # the hub also pushes edits of old videos, only post recent uploads
+    max_age = 60 * 60 * 24 * 2
+    video_url = 'https://www.youtube.com/watch?v={}'
+    video_id_re = re.compile(r'[A-Za-z0-9_-]{11}')
 
     def __init__(self, bot):
         self.bot = bot
         self.config = Config.get_conf(self, 1337, True)
         self.config.register_global(**self.global_default)
         self.config.register_channel(**self.channel_default)
-        # self.loop: Optional[asyncio.Task] = None
-        # self.redis: Optional[redis.Redis] = None
-        # self.pubsub: Optional[redis.client.PubSub] = None
-        # self.callback_url: Optional[str] = None
+        self.feeds: Optional[FeedPoller] = None
+        self.websub: Optional[WebSubReceiver] = None
+        self.process_lock = asyncio.Lock()
+        self.notify_tasks: Set[asyncio.Task] = set()
+        self.subscribers: Dict[str, Set[int]] = {}  # 'yt_channel_id': {discord_channel_id}
+        self.seen: Dict[str, Dict[str, None]] = {}  # 'yt_channel_id': ordered set of video_id
 
     async def cog_load(self):
         log.info('%s: Cog Load Start', self.__cog_name__)
-        # data: dict = await self.bot.get_shared_api_tokens('youtube')
-        # self.callback_url = data.get('callback')
-        # log.info('%s: Callback URL: %s', self.__cog_name__, self.callback_url)
-        # redis_data: dict = await self.bot.get_shared_api_tokens('redis')
-        # self.redis = redis.Redis(
-        #     host=redis_data.get('host', 'redis'),
-        #     port=int(redis_data.get('port', 6379)),
-        #     db=int(redis_data.get('db', 0)),
-        #     password=redis_data.get('pass', None),
-        # )
-        # await self.redis.ping()
-        # self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
-        # self.loop = asyncio.create_task(self.main_loop())
-        # self.sub_bub_task.start()
+        self.feeds = FeedPoller()
+        await self.load_index()
+        data: dict = await self.bot.get_shared_api_tokens('youtube')
+        if data.get('callback'):
+            await self.start_websub(data)
+        if self.websub:
+            self.poll_new_videos.change_interval(minutes=self.fallback_minutes)
+            self.sub_bub_task.start()
+        else:
+            self.poll_new_videos.change_interval(minutes=self.poll_minutes)
         self.poll_new_videos.start()
         log.info('%s: Cog Load Finish', self.__cog_name__)
 
     async def cog_unload(self):
         log.info('%s: Cog Unload', self.__cog_name__)
-        # self.sub_bub_task.cancel()
+        self.sub_bub_task.cancel()
         self.poll_new_videos.cancel()
-        # if self.loop and not self.loop.cancelled():
-        #     self.loop.cancel()
-        # if self.pubsub:
-        #     await self.pubsub.close()
-
-    # async def main_loop(self):
-    #     await self.bot.wait_until_ready()
-    #     log.info('%s: Start Main Loop', self.__cog_name__)
-    #     log.info('Listening on PubSub Channel: %s', self.channel)
-    #     await self.pubsub.subscribe(self.channel)
-    #     while self is self.bot.get_cog('YouTube'):
-    #         message = await self.pubsub.get_message(timeout=None)
-    #         # log.debug('message: %s', message)
-    #         if message:
-    #             await self.process_message(message)
-    #         await asyncio.sleep(0.01)
-
-    # async def process_message(self, message: dict) -> None:
-    #     try:
-    #         data = json.loads(message['data'].decode('utf-8'))
-    #         if 'new' in data['requests']:
-    #             asyncio.create_task(self.process_new(data))
-    #         resp = {'success': True, 'message': '202'}
-    #         pr = await self.redis.publish(data['channel'], json.dumps(resp, default=str))
-    #         log.debug('pr: %s', pr)
-    #
-    #     except Exception as error:
-    #         log.error('Exception Processing Message')
-    #         log.exception(error)
+        if self.websub:
+            await self.websub.stop()
+        for task in self.notify_tasks:
+            task.cancel()
+        if self.feeds:
+            await self.feeds.close()
+
+    async def start_websub(self, data: dict) -> None:
+        log.info('%s: Callback URL: %s', self.__cog_name__, data['callback'])
+        if not data.get('secret'):
+            # without a secret anyone can POST notifications to the callback
+            log.error('%s: WebSub requires a secret, polling only', self.__cog_name__)
+            return
+        websub = WebSubReceiver(
+            data['callback'],
+            on_verify=self.websub_verify,
+            on_notify=self.websub_notify,
+            host=data.get('host', '0.0.0.0'),
+            port=int(data.get('port', 8080)),
+            secret=data['secret'],
+        )
+        try:
+            await websub.start()
+            self.websub = websub
+        except OSError as error:
+            log.error('%s: WebSub receiver failed to start, polling only: %s', self.__cog_name__, error)
+
+    async def load_index(self) -> None:
+        subscribers: Dict[str, List[int]] = await self.config.subscribers()
+        if not subscribers:
+            all_channels: dict = await self.config.all_channels()
+            for chan_id, data in all_channels.items():
+                for yt_channel_id in data['channels']:
+                    subscribers.setdefault(yt_channel_id, []).append(chan_id)
+            if subscribers:
+                log.info('%s: Built subscribers index for %s channels', self.__cog_name__, len(subscribers))
+                await self.config.subscribers.set(subscribers)
+                await self.config.channels.set(list(subscribers))
+        self.subscribers = {k: set(v) for k, v in subscribers.items()}
+        all_videos: Dict[str, list] = await self.config.videos()
+        self.seen = {k: dict.fromkeys(v) for k, v in all_videos.items()}
+
+    async def add_subscriber(self, yt_channel_id: str, chan_id: int) -> bool:
+        """Returns True if this is the first subscriber to yt_channel_id."""
+        subscribers = self.subscribers.setdefault(yt_channel_id, set())
+        first = not subscribers
+        subscribers.add(chan_id)
+        await self.config.subscribers.set_raw(yt_channel_id, value=list(subscribers))
+        if first:
+            await self.config.channels.set(list(self.subscribers))
+        return first
+
+    async def remove_subscriber(self, yt_channel_id: str, chan_id: int) -> None:
+        subscribers = self.subscribers.get(yt_channel_id, set())
+        subscribers.discard(chan_id)
+        if subscribers:
+            await self.config.subscribers.set_raw(yt_channel_id, value=list(subscribers))
+            return
+        log.debug('Removing Channel: %s', yt_channel_id)
+        self.subscribers.pop(yt_channel_id, None)
+        self.seen.pop(yt_channel_id, None)
+        self.feeds.forget(yt_channel_id)
+        await self.config.subscribers.clear_raw(yt_channel_id)
+        await self.config.videos.clear_raw(yt_channel_id)
+        await self.config.channels.set(list(self.subscribers))
+        await self.sub_to_channel(yt_channel_id, 'unsubscribe')
+
+    async def mark_seen(self, yt_channel_id: str, video_ids: List[str]) -> None:
+        seen = self.seen.setdefault(yt_channel_id, {})
+        for video_id in video_ids:
+            seen[video_id] = None
+        while len(seen) > self.seen_max:
+            del seen[next(iter(seen))]
+        await self.config.videos.set_raw(yt_channel_id, value=list(seen))
+
+    async def websub_verify(self, mode: str, channel_id: str, lease: int) -> bool:
+        channels = self.subscribers
+        if mode == 'subscribe':
+            if channel_id not in channels:
+                return False
+            async with self.config.leases() as leases:
+                leases[channel_id] = int(time.time()) + lease
+        else:
+            if channel_id in channels:
+                return False
+            async with self.config.leases() as leases:
+                leases.pop(channel_id, None)
+        log.info('WebSub: %s verified: %s', mode, channel_id)
+        return True
+
+    async def websub_notify(self, feed: dict) -> None:
+        log.debug('WebSub: notification received')
+        task = asyncio.create_task(self.process_new(feed))
+        self.notify_tasks.add(task)
+        task.add_done_callback(self.notify_done)
+
+    def notify_done(self, task: asyncio.Task) -> None:
+        self.notify_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            log.error('WebSub: Error processing notification', exc_info=task.exception())
+
+    def is_recent(self, entry: dict) -> bool:
+        try:
+            published = datetime.datetime.fromisoformat(entry['published'])
+        except (KeyError, TypeError, ValueError):
+            return True
+        age = datetime.datetime.now(datetime.timezone.utc) - published
+        return age.total_seconds() < self.max_age
 
     async def process_new(self, raw_data):
         log.debug('Start: process_new')
@@ -101,104 +190,82 @@ class YouTube(commands.Cog):
         else:
             entries = raw_data['feed']['entry']
 
-        channels = await self.config.channels()
-        all_channels = await self.config.all_channels()
-        for entry in reversed(entries):
-            log.debug('-'*40)
-            yt_video_id = entry['yt:videoId']
-            # log.debug('yt_video_id: %s', yt_video_id)
-            yt_channel_id = entry['yt:channelId']
-            # log.debug('yt_channel_id: %s', yt_channel_id)
-            if yt_channel_id not in channels:
-                log.warning('----- CHANNEL NOT CONFIGURED -----')
-                continue
-            all_videos = await self.config.videos()
-            if yt_video_id in all_videos[yt_channel_id]:
-                log.warning('----- VIDEO ALREADY PROCESSED -----')
-                continue
-            all_videos[yt_channel_id].append(yt_video_id)
-            all_videos[yt_channel_id] = all_videos[yt_channel_id][-30:]
-            # log.debug(all_videos)
-            await self.config.videos.set(all_videos)
-            log.debug('----- PROCESS NEW -----')
-            name = entry['author']['name'] if 'name' in entry['author'] else 'Unknown'
-            log.debug('name: %s', name)
-            url = entry['link']['@href']
-            log.debug('url: %s', url)
-            message = f'**{name}** {url}'
-            for chan_id, yt_channels in await AsyncIter(all_channels.items(), delay=2, steps=10):
-                if yt_channel_id in yt_channels['channels']:
+        async with self.process_lock:
+            for entry in reversed(entries):
+                log.debug('-'*40)
+                yt_video_id = entry['yt:videoId']
+                if not self.video_id_re.fullmatch(yt_video_id or ''):
+                    log.warning('Invalid video id: %s', yt_video_id)
+                    continue
+                yt_channel_id = entry['yt:channelId']
+                subscribers = self.subscribers.get(yt_channel_id)
+                if not subscribers:
+                    log.warning('----- CHANNEL NOT CONFIGURED -----')
+                    continue
+                if yt_video_id in self.seen.get(yt_channel_id, {}):
+                    log.warning('----- VIDEO ALREADY PROCESSED -----')
+                    continue
+                if not self.is_recent(entry):
+                    log.debug('Skipping old video: %s %s', yt_video_id, entry.get('published'))
+                    continue
+                await self.mark_seen(yt_channel_id, [yt_video_id])
+                log.debug('----- PROCESS NEW -----')
+                name = entry['author']['name'] if 'name' in entry['author'] else 'Unknown'
+                name = discord.utils.escape_markdown(name)
+                log.debug('name: %s', name)
+                url = self.video_url.format(yt_video_id)
+                log.debug('url: %s', url)
+                message = f'**{name}** {url}'
+                for chan_id in list(subscribers):
                     channel: discord.TextChannel = self.bot.get_channel(chan_id)
                     if not channel:
-                        log.warning('404: Deleting Channel Config: %s: %s', chan_id, yt_channels)
-                        await self.config.channel_from_id(int(chan_id)).clear()
+                        log.warning('404: Deleting Channel Config: %s', chan_id)
+                        await self.remove_channel(chan_id)
                         continue
-                    await channel.send(message)
-            log.debug('-'*40)
+                    await channel.send(message, allowed_mentions=discord.AllowedMentions.none())
+                log.debug('-'*40)
         log.debug('Finish: process_new')
 
-    # @tasks.loop(time=datetime.time(hour=18, minute=0, tzinfo=datetime.timezone.utc))
-    # async def sub_bub_task(self):
-    #     log.info('%s: Sub Bub Task - Start', self.__cog_name__)
-    #     await self.update_channels_list()
-    #     channels: list = await self.config.channels()
-    #     log.debug(channels)
-    #     for chan in channels:
-    #         await self.sub_to_channel(chan)
-    #         await asyncio.sleep(1.0)
-    #     log.info('%s: Sub Bub Task - Finish', self.__cog_name__)
+    @tasks.loop(hours=1.0)
+    async def sub_bub_task(self):
+        await self.bot.wait_until_ready()
+        log.info('%s: Sub Bub Task - Start', self.__cog_name__)
+        channels: List[str] = list(self.subscribers)
+        leases: Dict[str, int] = await self.config.leases()
+        renew = int(time.time()) + self.lease_renew
+        for chan in channels:
+            if leases.get(chan, 0) > renew:
+                continue
+            try:
+                await self.websub.subscribe(chan)
+            except Exception as error:
+                log.warning('WebSub: Error renewing %s: %s', chan, error)
+            await asyncio.sleep(0.5)
+        log.info('%s: Sub Bub Task - Finish', self.__cog_name__)
 
     @tasks.loop(minutes=30.0)
     async def poll_new_videos(self):
         await self.bot.wait_until_ready()
-        await self.update_channels_list()
         log.debug('-'*40)
         log.info('%s: Poll Videos Task - Start', self.__cog_name__)
-        channels: list = await self.config.channels()  # [channel_id]
-        for channel_id in channels:
-            # log.debug('channel_id: %s', channel_id)
-            all_videos: Dict[str, list] = await self.config.videos()  # 'channel_id': [video_id]
-            video_feeds: Dict[str, dict] = await self.get_feed_videos(channel_id, True)  # 'video_id': {entry}
+        channels: List[str] = list(self.subscribers)  # [channel_id]
+        start = time.monotonic()
+        changed: Dict[str, Dict[str, dict]] = await self.feeds.poll(channels)  # 'channel_id': {'video_id': {entry}}
+        log.debug('polled %s feeds, %s changed in %.2fs', len(channels), len(changed), time.monotonic() - start)
+        for channel_id, video_feeds in changed.items():
             for video_id, entry in reversed(video_feeds.items()):
-                # log.debug('video_id: %s', video_id)  # 'video_id'
-                # log.debug('entry: %s', entry)  # {entry}
-                if video_id not in all_videos[channel_id]:
+                if video_id not in self.seen.get(channel_id, {}):
                     log.debug('--- FOUND NEW VIDEO: %s - %s', channel_id, video_id)
                     data = {'feed': {'entry': entry}}
                     await self.process_new(data)
-            # await asyncio.sleep(1.0)
-            # log.debug('yt:videoId: %s', entry['yt:videoId'])
-            # for video in all_videos[channel_id]:
-            #     if video not in video_feeds[channel_id]:
-            #         log.debug('Found New Video: %s', video)
-            #         all_videos[channel_id].append(video)
-            # log.debug('all_videos: %s', all_videos)
         log.info('%s: Poll Videos Task - Finish', self.__cog_name__)
         log.debug('-'*40)
 
-    # @tasks.loop(minutes=60)
-    async def update_channels_list(self):
-        log.info('%s: Update Chan - Start', self.__cog_name__)
-        new_channels = []
-        all_channels: dict = await self.config.all_channels()
-        log.debug('all_channels: %s', all_channels)
-        for _, chans in all_channels.items():
-            for chan, _ in chans['channels'].items():
-                if chan not in new_channels:
-                    new_channels.append(chan)
-        before = await self.config.channels()
-        log.debug('before: %s', before)
-        await self.config.channels.set(new_channels)
-        log.debug('new_channels: %s', new_channels)
-        all_videos: Dict[str, list] = await self.config.videos()
-        new_videos: Dict[str, list] = {}
-        for channel_id, channels in all_videos.items():
-            if channel_id in new_channels:
-                new_videos[channel_id] = channels
-            else:
-                log.debug('Removing Channel: %s: %s', channel_id, channels)
-        await self.config.videos.set(new_videos)
-        log.info('%s: Update Chan - Finish', self.__cog_name__)
+    async def remove_channel(self, chan_id: int) -> None:
+        yt_channels: dict = await self.config.channel_from_id(chan_id).channels()
+        await self.config.channel_from_id(chan_id).clear()
+        for yt_channel_id in yt_channels:
+            await self.remove_subscriber(yt_channel_id, chan_id)
 
     @commands.hybrid_group(name='youtube', aliases=['yt'], description='Options for manging YouTube')
     @commands.guild_only()
@@ -240,16 +307,15 @@ class YouTube(commands.Cog):
                 chan_conf: dict = await self.config.channel(ctx.channel).channels()
                 chan_conf.update(chan)
                 await self.config.channel(ctx.channel).channels.set(chan_conf)
-        all_channels: list = await self.config.channels()
         for chan in chan_data:
             cid = list(chan.keys())[0]
-            if cid not in all_channels:
+            if cid not in self.seen:
+                # seed before subscribing so existing videos are not posted
+                video_list = await self.get_feed_videos(cid)
+                await self.mark_seen(cid, list(reversed(video_list)))
+            # add before subscribing so the hub verification is accepted
+            if await self.add_subscriber(cid, ctx.channel.id):
                 await self.sub_to_channel(cid)
-                # if not r.is_success:
-                #     continue  # TODO: Process Error
-                all_channels: list = await self.config.channels()
-                all_channels.append(cid)
-                await self.config.channels.set(all_channels)
                 await asyncio.sleep(0.1)
         msg = (f'✅ Added YouTube Channels: **{cf.humanize_list(names_split)}** '
                f'to Discord Channel: `{ctx.channel.name}`')
@@ -265,7 +331,7 @@ class YouTube(commands.Cog):
         await ctx.defer()
         channels = await self.config.channel(ctx.channel).channels()
         log.debug('channels: %s', channels)
-        await self.config.channel(ctx.channel).clear()
+        await self.remove_channel(ctx.channel.id)
         clist = list(channels.values()) if channels else 'None'
         await ctx.send(f'All Channels Removed from This Channel: {clist}', ephemeral=True, delete_after=60)
 
@@ -318,51 +384,19 @@ class YouTube(commands.Cog):
     #     await ctx.send(str(datetime.datetime.now()))
 
     async def sub_to_channel(self, channel_id: str, mode: str = 'subscribe') -> None:
-        log.debug('sub_to_channel: %s', channel_id)
-
-        # update config, this is apparently important
-        all_videos = await self.config.videos()
-        if channel_id not in all_videos:
-            video_list = await self.get_feed_videos(channel_id)
-            all_videos[channel_id] = video_list
-            await self.config.videos.set(all_videos)
-
-        # if not self.callback_url:
-        #     raise ValueError('self.callback_url Not Defined')
-        # topic_url = f'https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}'
-        # data = {
-        #     'hub.callback': self.callback_url,
-        #     'hub.topic': topic_url,
-        #     'hub.verify': 'async',
-        #     'hub.mode': mode,
-        #     'hub.verify_token': '',
-        #     'hub.secret': '',
-        #     'hub.lease_numbers': '',
-        # }
-        # url = 'https://pubsubhubbub.appspot.com/subscribe'
-        # async with httpx.AsyncClient(**self.http_options) as client:
-        #     r = await client.post(url, data=data)
-        #     r.raise_for_status()
-        # # log.debug('r.status_code: %s', r.status_code)
-        # return r
+        log.debug('sub_to_channel: %s %s', mode, channel_id)
+        if self.websub:
+            try:
+                await self.websub.subscribe(channel_id, mode)
+            except Exception as error:
+                log.warning('WebSub: Error on %s %s: %s', mode, channel_id, error)
 
     async def get_feed_videos(self, channel_id, as_dict=False) -> Union[list, dict]:
-        topic_url = f'https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}'
-        async with httpx.AsyncClient(**self.http_options) as client:
-            r = await client.get(topic_url)
-            r.raise_for_status()
-        # log.debug('r.status_code: %s', r.status_code)
-        feed = xmltodict.parse(r.text)
+        video_data: Dict[str, dict] = await self.feeds.fetch(channel_id, force=True)
         if as_dict:
-            video_data = {}
-            for entry in feed['feed']['entry']:
-                video_data[entry['yt:videoId']] = entry
             return video_data
         else:
-            video_list = []
-            for entry in feed['feed']['entry']:
-                video_list.append(entry['yt:videoId'])
-            return video_list
+            return list(video_data.keys())
 
     async def get_channel_data(self, name: str) -> Optional[dict]:
         try: